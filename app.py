@@ -10,6 +10,7 @@ Created on Wed Feb  5 17:15:57 2025
 import streamlit as st
 from home import home_page
 from grading_system import grading_system_page
+from grading_system_spacy import grading_system_spacy_page
 from user_guide import user_guide_page
 from about import about_page
 
@@ -28,6 +29,8 @@ if st.sidebar.button("Home", type="primary"):
     st.session_state.page = "Home"
 if st.sidebar.button("Grading System", type="primary"):
     st.session_state.page = "Grading System"
+if st.sidebar.button("Grading System with Spacy", type="primary"):
+    st.session_state.page = "Grading System with Spacy"
 if st.sidebar.button("User Guide", type="primary"):
     st.session_state.page = "User Guide"
 if st.sidebar.button("About", type="primary"):
@@ -41,6 +44,9 @@ if st.session_state.page == "Home":
 elif st.session_state.page == "Grading System":
     grading_system_page()
 
+elif st.session_state.page == "Grading System with Spacy":
+    grading_system_spacy_page()
+
 # Display user guide content if selected
 elif st.session_state.page == "User Guide":
   user_guide_page()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code runs the grading system from the command line, without Streamlit.
+It validates and grades a key file and a response file the same way the Grading System page does, writes the
+final, per-student, per-question and per-response results to an output folder (as CSV or Parquet) and prints a
+throughput summary.
+
+Run it with:  python -m batch_grader KEY.csv RESPONSES.csv --output-dir results [--chunksize 100000] [--format parquet]
+Both input files may also be Parquet files (.parquet).
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import argparse
+import os
+import sys
+import time
+
+from graders import GradingRun, embedding_cache_stats, essay_dedup_report
+from instrumentation import collect, stage
+from model_provider import warmup
+from validator import validate_csv
+
+KEY_COLUMNS = ["QuestionID", "Correct_Answer", "Type"]
+RESPONSE_COLUMNS = ["StudentID", "QuestionID", "Student_Answer", "Type"]
+
+
+# Stages of essay scoring, used for the essays/s throughput
+ESSAY_STAGES = ("encode", "similarity", "banding")
+
+
+# Function to put MCQ, essay and final scores side by side for every student
+def per_student_scores(mcq_scores, essay_scores, final_scores):
+    per_student = final_scores.rename(columns={'Score': 'Final_Score'})
+    per_student = per_student.merge(mcq_scores.rename(columns={'Score': 'MCQ_Score'}), on='StudentID', how='left')
+    per_student = per_student.merge(essay_scores.rename(columns={'Score': 'Essay_Score'}), on='StudentID', how='left')
+    per_student[['MCQ_Score', 'Essay_Score']] = per_student[['MCQ_Score', 'Essay_Score']].fillna(0)
+    return per_student[['StudentID', 'MCQ_Score', 'Essay_Score', 'Final_Score']]
+
+
+# Function to validate and grade both files in memory, in one pass over the responses;
+# returns the results, how many essay answers were left after deduplication, and the error
+def grade_in_memory(key_df, response_file, processes=None, backend=None):
+    response_df, error = validate_csv(response_file, RESPONSE_COLUMNS, key_df, compact=True)
+    if error:
+        return None, None, error
+    try:
+        run = GradingRun(key_df, response_df)
+        run.score_mcq()
+        run.score_essays(processes=processes, backend=backend)
+    except Exception as e:
+        return None, None, f"Grading failed: {e}"
+    return (*run.totals(), run.question_summary(), run.item_scores()), essay_dedup_report(response_df), None
+
+
+# Function to write the results to the output folder as CSV or Parquet; the score of every response
+# (per_item) is only available when the submission was graded in memory
+def write_outputs(output_dir, mcq_scores, essay_scores, final_scores, question_scores, item_scores=None,
+                  output_format="csv"):
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {"final": final_scores, "per_student": per_student_scores(mcq_scores, essay_scores, final_scores),
+               "per_question": question_scores, "per_item": item_scores}
+    for name, df in outputs.items():
+        if df is None:
+            continue
+        path = os.path.join(output_dir, f"{name}.{output_format}")
+        if output_format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+
+
+# Function to print the throughput summary from the recorded stages (a Trace.to_frame() table)
+def print_summary(stages, wall, question_scores, dedup_report=None, out=None):
+    out = out or sys.stdout
+    responses = int(question_scores['Responses'].sum())
+    essays = int(question_scores.loc[question_scores['Type'] == 'ESSAY', 'Responses'].sum())
+    print("Stage            Seconds", file=out)
+    for name, seconds in zip(stages['stage'], stages['wall_seconds']):
+        print(f"{name:<16} {seconds:8.3f}", file=out)
+    print(f"{'total':<16} {wall:8.3f}", file=out)
+    print(f"Responses graded: {responses} ({responses / wall if wall else 0:,.0f} rows/s)", file=out)
+    essay_seconds = stages.loc[stages['stage'].isin(ESSAY_STAGES), 'wall_seconds'].sum() or wall
+    print(f"Essays graded:    {essays} ({essays / essay_seconds if essay_seconds else 0:,.0f} essays/s)", file=out)
+    if dedup_report is not None and len(dedup_report):
+        answers, unique = int(dedup_report['Responses'].sum()), int(dedup_report['Unique_Answers'].sum())
+        print(f"Essays encoded:   {unique} unique of {answers} ({1 - unique / answers:.0%} deduplicated)", file=out)
+    cache_stats = embedding_cache_stats()
+    if cache_stats is not None:
+        print(f"Embedding cache:  {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate)", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch_grader",
+                                     description="Grade MCQ and essay responses without the Streamlit UI.")
+    parser.add_argument("key_file", help="assessment key CSV or Parquet (QuestionID, Correct_Answer, Type)")
+    parser.add_argument("response_file",
+                        help="student submission CSV or Parquet (StudentID, QuestionID, Student_Answer, Type)")
+    parser.add_argument("--output-dir", default="results",
+                        help="folder for the final, per_student, per_question and per_item results")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", dest="output_format",
+                        help="file format of the results")
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="grade the responses in chunks of this many rows (0 loads the whole file)")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes for essay encoding")
+    parser.add_argument("--diagnostics", action="store_true",
+                        help="also print the wall time, CPU time, rows and memory change of every grading stage")
+    args = parser.parse_args(argv)
+
+    # The summary and the diagnostics table both come from the stages recorded here
+    start = time.perf_counter()
+    with collect() as trace:
+        question_scores, dedup_report = grade_files(args)
+    if question_scores is None:
+        return 1
+    stages = trace.to_frame()
+    print_summary(stages, time.perf_counter() - start, question_scores, dedup_report)
+    if args.diagnostics:
+        print(stages.to_string(index=False))
+        if dedup_report is not None and len(dedup_report):
+            print(dedup_report.to_string(index=False))
+    return 0
+
+
+# Function to validate, grade and write the results of the files given on the command line;
+# returns the per-question scores and the essay deduplication report (None in chunked mode),
+# or (None, None) after printing the error
+def grade_files(args):
+    key_df, error = validate_csv(args.key_file, KEY_COLUMNS)
+    if error:
+        print(f"Assessment key: {error}", file=sys.stderr)
+        return None, None
+
+    if (key_df['Type'] == 'ESSAY').any():
+        with stage("load model"):
+            warmup()
+
+    if args.chunksize:
+        from chunked_grading import grade_csv_in_chunks
+        results, error = grade_csv_in_chunks(key_df, args.response_file, RESPONSE_COLUMNS, chunksize=args.chunksize,
+                                             processes=args.processes)
+        dedup_report = None
+    else:
+        results, dedup_report, error = grade_in_memory(key_df, args.response_file, args.processes)
+    if error:
+        print(f"Student submission: {error}", file=sys.stderr)
+        return None, None
+
+    with stage("write", len(results[2])):
+        write_outputs(args.output_dir, *results, output_format=args.output_format)
+    return results[3], dedup_report
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code measures how validation and grading scale with the size of a cohort.
+It builds synthetic cohorts (students, questions, MCQ/essay mix, essay length and how often answers repeat), runs
+validate_csv, grade_mcq_questions and grade_essay_questions on each and records the wall time, the throughput and
+the peak memory (RSS) of every stage. Essays are graded twice: once against an empty embedding cache ("essay") and
+once more with every embedding in the cache ("essay_cached").
+The results are written as JSON and compared with a baseline file; a stage that got slower or bigger than the
+thresholds allow is reported as a regression and the run exits with status 1. Each file records the machine it
+was made on; a baseline recorded on another machine is compared after scaling by a calibration workload run on
+both, unless the calibration times differ by less than their own noise.
+
+With --encoder stub the essays are encoded by a small deterministic stand-in for the model (a bag of hashed words),
+so deduplication, batching, the embedding cache, similarity and banding are measured without downloading the model.
+The committed baseline uses it; to follow the real model, save a baseline with --encoder model on the machine you
+compare on.
+
+Run it with:  python benchmark.py --encoder stub [--cohorts 100x40 1000x40 10000x40] [--output benchmark_results.json]
+Save a new baseline with:  python benchmark.py --encoder stub --save-baseline
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import graders
+from graders import grade_essay_questions, grade_mcq_questions
+from instrumentation import current_rss
+from model_provider import EMBEDDING_DIM, MODEL_NAME, use_model, warmup
+from validator import validate_csv
+
+SAMPLE_KEY = os.path.join("CSV files", "correct_answers.csv")
+BASELINE_FILE = "benchmark_baseline.json"
+KEY_COLUMNS = ["QuestionID", "Correct_Answer", "Type"]
+RESPONSE_COLUMNS = ["StudentID", "QuestionID", "Student_Answer", "Type"]
+MCQ_OPTIONS = np.array(["A", "B", "C", "D"])
+STAGES = ("validate", "mcq", "essay", "essay_cached")
+ENCODERS = ("model", "stub")
+
+# A stage regresses when it is this much slower, or its peak RSS this much higher, than in the baseline
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.20
+# Stages that take a few milliseconds vary by more than the threshold from run to run; a stage only counts as
+# slower when it also takes at least this many seconds longer
+MIN_SLOWDOWN_SECONDS = 0.05
+# Parts of the machine profile that identify a machine; timings from the same machine are never rescaled
+MACHINE_FIELDS = ("platform", "cpu", "cpus", "memory_gb")
+
+
+# Function to make a synthetic cohort; returns (key_df, response_df).
+# Every student answers every question. Essay answers are drawn from the words of the sample reference answers,
+# with lengths from a log-normal distribution around essay_words; duplicate_rate is the share of essay answers that
+# repeat another student's answer to the same question.
+def synthetic_cohort(students, questions, essay_share=0.25, essay_words=40, essay_spread=0.5,
+                     duplicate_rate=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(" ".join(pd.read_csv(SAMPLE_KEY)['Correct_Answer'].astype(str)).split())
+
+    def essay(words):
+        return " ".join(vocabulary[rng.integers(0, len(vocabulary), max(1, int(words)))])
+
+    essays = int(round(questions * essay_share))
+    question_ids = np.arange(1, questions + 1)
+    question_types = np.where(question_ids > questions - essays, "ESSAY", "MCQ")
+    key_df = pd.DataFrame({'QuestionID': question_ids, 'Type': question_types})
+    key_df['Correct_Answer'] = [essay(essay_words) if question_type == "ESSAY" else MCQ_OPTIONS[rng.integers(4)]
+                                for question_type in question_types]
+
+    response_df = pd.DataFrame({
+        'StudentID': np.repeat(np.arange(1, students + 1), questions),
+        'QuestionID': np.tile(question_ids, students),
+        'Type': np.tile(question_types, students),
+    })
+    answers = MCQ_OPTIONS[rng.integers(0, len(MCQ_OPTIONS), len(response_df))].astype(object)
+    essay_rows = np.flatnonzero(response_df['Type'].to_numpy() == "ESSAY")
+    lengths = rng.lognormal(np.log(essay_words), essay_spread, len(essay_rows))
+    answers[essay_rows] = [essay(words) for words in lengths]
+    # Repeated answers copy the answer of the first student to the same question
+    repeated = essay_rows[(rng.random(len(essay_rows)) < duplicate_rate) & (essay_rows >= questions)]
+    answers[repeated] = answers[repeated % questions]
+    response_df['Student_Answer'] = answers
+    return key_df[KEY_COLUMNS], response_df[RESPONSE_COLUMNS]
+
+
+# A small, deterministic stand-in for the sentence transformer: each text becomes a bag of hashed words. It has the
+# parts of the model's interface the graders use, so the essay stages run all of their own code around it.
+class HashingEncoder:
+    max_seq_length = 256
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    # Words stand in for tokens (plus the two special tokens the model adds)
+    def tokenizer(self, texts, truncation=True, max_length=None, **kwargs):
+        lengths = [len(text.split()) + 2 for text in texts]
+        if truncation and max_length:
+            lengths = [min(length, max_length) for length in lengths]
+        return {"length": lengths}
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, normalize_embeddings=True,
+               show_progress_bar=False):
+        words = [text.lower().split()[:self.max_seq_length] for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(text_words) for text_words in words])
+        columns = np.fromiter((zlib.crc32(word.encode("utf-8")) % self.dim for text_words in words
+                               for word in text_words), dtype=np.int64, count=len(rows))
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(embeddings, (rows, columns), 1.0)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms > 0, norms, 1)
+
+
+# Function to time a fixed workload (sorting, grouping and parsing a CSV) in several rounds of about 0.2 s each.
+# Returns the median round time in seconds and the noise: the largest deviation of a round from the median,
+# relative to the median.
+def calibrate(rounds=9, repeats=3):
+    rng = np.random.default_rng(0)
+    values = rng.random(1_000_000)
+    keys = rng.integers(0, 1000, len(values))
+    text = pd.DataFrame({'key': keys[:100_000], 'value': values[:100_000]}).to_csv(index=False)
+    workloads = [lambda: np.sort(values), lambda: pd.Series(values).groupby(keys).sum(),
+                 lambda: pd.read_csv(io.StringIO(text))]
+    round_seconds = []
+    for _ in range(rounds):
+        total = 0.0
+        for workload in workloads:
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                workload()
+                best = min(best, time.perf_counter() - start)
+            total += best
+        round_seconds.append(total)
+    median = float(np.median(round_seconds))
+    noise = float(np.max(np.abs(np.array(round_seconds) - median)) / median)
+    return round(median, 4), round(noise, 3)
+
+
+# Function to describe the machine the benchmark runs on
+def machine_profile():
+    cpu = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpu = next(line.split(":", 1)[1].strip() for line in f if line.startswith("model name"))
+    except (OSError, StopIteration):
+        pass
+    try:
+        memory_gb = round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2**30, 1)
+    except (ValueError, OSError, AttributeError):
+        memory_gb = None
+    calibration_seconds, calibration_noise = calibrate()
+    return {"platform": platform.platform(), "cpu": cpu, "cpus": os.cpu_count(), "memory_gb": memory_gb,
+            "calibration_seconds": calibration_seconds, "calibration_noise": calibration_noise}
+
+
+# Follows the peak RSS of this process while one stage runs. On Linux the kernel's high-water mark is reset
+# before the stage; elsewhere the current RSS is sampled, which can miss short peaks.
+class PeakMemory:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+
+    def __enter__(self):
+        self._reset = _reset_peak_rss()
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+        if self._reset:
+            self.peak = max(self.peak, _peak_rss())
+        return False
+
+
+def _peak_rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _current_rss():
+    rss = current_rss()
+    if rss is None:
+        # Without /proc only the peak of the whole process is known (bytes on macOS, kilobytes elsewhere)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return rss
+
+
+# Function to run one stage; returns its measurements and its result
+def measure(rows, stage, *args):
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        result = stage(*args)
+        seconds = time.perf_counter() - start
+    # The graders print their errors and return None
+    if result is None:
+        raise RuntimeError(f"The {stage.__name__} stage failed")
+    return {"seconds": round(seconds, 4), "rows": rows, "rows_per_second": round(rows / seconds, 1) if seconds else None,
+            "peak_rss_mb": round(memory.peak / 2**20, 1)}, result
+
+
+# Function to run the stages on one cohort; the files are written first, so validation includes reading them
+def run_cohort(name, settings, stages=STAGES):
+    key_df, response_df = synthetic_cohort(**settings)
+    essay_rows = int((response_df['Type'] == "ESSAY").sum())
+    rows = {"validate": len(response_df), "mcq": len(response_df) - essay_rows, "essay": essay_rows}
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        key_path = os.path.join(folder, "key.csv")
+        response_path = os.path.join(folder, "responses.csv")
+        key_df.to_csv(key_path, index=False)
+        response_df.to_csv(response_path, index=False)
+
+        def validate():
+            key_df, error = validate_csv(key_path, KEY_COLUMNS)
+            response_df, response_error = validate_csv(response_path, RESPONSE_COLUMNS, key_df)
+            if error or response_error:
+                raise ValueError(error or response_error)
+            return key_df, response_df
+
+        results["validate"], (key_df, response_df) = measure(rows["validate"], validate)
+        if "mcq" in stages:
+            results["mcq"], _ = measure(rows["mcq"], grade_mcq_questions, key_df, response_df)
+        if "essay" in stages or "essay_cached" in stages:
+            # Each cohort starts with an empty embedding cache of its own
+            graders.set_embedding_cache_dir(os.path.join(folder, "embedding_cache"))
+            try:
+                results["essay"], _ = measure(rows["essay"], grade_essay_questions, key_df, response_df)
+                # The same answers again: every embedding now comes from the cache
+                results["essay_cached"], _ = measure(rows["essay"], grade_essay_questions, key_df, response_df)
+            finally:
+                graders.set_embedding_cache_dir("")
+    return {"cohort": name, "settings": settings, "stages": {stage: results[stage] for stage in stages}}
+
+
+# Function to return how much slower this machine is than the baseline's, from their calibration times. Results
+# from the same machine, and calibration times that differ by no more than both calibrations' noise, give 1.0.
+def machine_factor(results, baseline):
+    now, before = results["environment"], baseline["environment"]
+    if all(now.get(name) == before.get(name) for name in MACHINE_FIELDS):
+        return 1.0
+    if not now.get("calibration_seconds") or not before.get("calibration_seconds"):
+        return 1.0
+    ratio = now["calibration_seconds"] / before["calibration_seconds"]
+    noise = now.get("calibration_noise", 0) + before.get("calibration_noise", 0)
+    if abs(np.log(ratio)) <= np.log(1 + noise):
+        return 1.0
+    return ratio
+
+
+# Function to compare results with a baseline; returns one row per stage found in both, with a Status column.
+# Times are divided by the machine factor first; essay stages are only compared when the same encoder was used.
+def compare(results, baseline, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    baseline_stages = {(run["cohort"], stage): values
+                       for run in baseline["runs"] for stage, values in run["stages"].items()}
+    factor = machine_factor(results, baseline)
+    same_encoder = results["environment"].get("encoder") == baseline["environment"].get("encoder")
+    rows = []
+    for run in results["runs"]:
+        for stage, values in run["stages"].items():
+            before = baseline_stages.get((run["cohort"], stage))
+            if before is None or (stage.startswith("essay") and not same_encoder):
+                continue
+            time_ratio = values["seconds"] / before["seconds"] / factor if before["seconds"] else 1.0
+            memory_ratio = values["peak_rss_mb"] / before["peak_rss_mb"] if before["peak_rss_mb"] else 1.0
+            slower = (time_ratio > 1 + time_threshold
+                      and values["seconds"] / factor - before["seconds"] > MIN_SLOWDOWN_SECONDS)
+            bigger = memory_ratio > 1 + memory_threshold
+            rows.append({"Cohort": run["cohort"], "Stage": stage,
+                         "Seconds": values["seconds"], "Baseline_Seconds": before["seconds"],
+                         "Time_Ratio": round(time_ratio, 2),
+                         "Peak_RSS_MB": values["peak_rss_mb"], "Baseline_RSS_MB": before["peak_rss_mb"],
+                         "Memory_Ratio": round(memory_ratio, 2),
+                         "Status": "REGRESSION" if slower or bigger else "ok"})
+    return rows
+
+
+# Function to render report rows (dicts with the same keys) as a Markdown table
+def to_markdown(rows):
+    columns = list(rows[0])
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    lines += ["| " + " | ".join(str(row[c]) for c in columns) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+# Function to parse a cohort size written as STUDENTSxQUESTIONS
+def cohort_size(text):
+    try:
+        students, questions = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected STUDENTSxQUESTIONS, got {text!r}") from None
+    return students, questions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how validation and grading scale with the cohort size.")
+    parser.add_argument("--cohorts", nargs="+", type=cohort_size, default=[(100, 40), (1000, 40), (10000, 40)],
+                        metavar="STUDENTSxQUESTIONS", help="cohort sizes to run")
+    parser.add_argument("--essay-share", type=float, default=0.25, help="share of the questions that are essays")
+    parser.add_argument("--essay-words", type=float, default=40, help="median essay length in words")
+    parser.add_argument("--essay-spread", type=float, default=0.5, help="log-normal spread of the essay lengths")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1,
+                        help="share of essay answers that repeat another student's answer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--encoder", choices=ENCODERS, default="model",
+                        help="encode essays with the model, or with a small deterministic stand-in (stub)")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline to compare the results with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline instead")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    # The shared on-disk embedding cache would turn repeated runs into lookups; the essay stages use their own
+    graders.set_embedding_cache_dir("")
+    stages = [stage for stage in STAGES if stage in args.stages or stage == "validate"]
+    if args.encoder == "stub":
+        use_model(HashingEncoder())
+    elif "essay" in stages or "essay_cached" in stages:
+        # The model is loaded before the stages, so the essay stages measure encoding only
+        warmup()
+
+    results = {
+        "environment": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+                        **machine_profile(), "encoder": MODEL_NAME if args.encoder == "model" else "stub"},
+        "runs": [],
+    }
+    for students, questions in args.cohorts:
+        name = f"{students}x{questions}"
+        settings = {"students": students, "questions": questions, "essay_share": args.essay_share,
+                    "essay_words": args.essay_words, "essay_spread": args.essay_spread,
+                    "duplicate_rate": args.duplicate_rate, "seed": args.seed}
+        run = run_cohort(name, settings, stages)
+        results["runs"].append(run)
+        print(to_markdown([{"Cohort": name, "Stage": stage, **values} for stage, values in run["stages"].items()]))
+
+    path = args.baseline if args.save_baseline else args.output
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {path}")
+    if args.save_baseline:
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; save one with --save-baseline")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    print(f"Machine factor (calibration time against the baseline's): {machine_factor(results, baseline):.2f}")
+    print(to_markdown(rows) if rows else "No stage in the results has a baseline to compare with")
+    if any(row["Status"] == "REGRESSION" for row in rows):
+        print("Regression: some stages are slower or use more memory than the baseline allows")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code is responsible for grading response files that are too large to load at once.
+The responses are read in chunks, each chunk is validated and graded against the in-memory key, and the
+per-student totals are added up as the chunks go by. The result is the same as validating and grading the
+whole file in memory. Only one chunk of the file is held at a time; finding duplicate rows and repeated answers
+across chunks keeps a 64-bit hash history that grows with the file (about 16 bytes per row).
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import numpy as np
+import pandas as pd
+
+from graders import GradingRun, KeyEmbeddings
+from instrumentation import stage
+from validator import CsvValidator, arrow_to_frame, infer_ids, is_parquet, open_parquet
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+# Function to add one chunk's totals (indexed by the given columns) to the running totals
+def _add_totals(totals, chunk_totals, by, columns=('Score',)):
+    chunk_totals = chunk_totals.set_index(by)[list(columns)]
+    return chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+
+
+# Function to read a CSV or Parquet file in chunks; CSV is read as text so every chunk gets the same column types,
+# Parquet keeps the types stored in the file and only reads the expected columns
+def _read_chunks(response_file, expected_columns, chunksize):
+    if not is_parquet(response_file):
+        yield from pd.read_csv(response_file, chunksize=chunksize, dtype=str)
+        return
+    parquet_file, columns = open_parquet(response_file, expected_columns)
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        yield arrow_to_frame(batch)
+
+
+# Function to give the text QuestionIDs of a CSV chunk the numeric type of the key's IDs, so "1.0" finds question 1.
+# They are kept as floats in every chunk, so an ID hashes the same whichever chunk it is in; returns the IDs and
+# whether any was written as a decimal. Chunks with IDs that are not numbers stay text and fail validation.
+def _question_ids(ids, key_dtype):
+    if key_dtype.kind not in "iuf":
+        return ids, False
+    numbers = pd.to_numeric(ids, errors='coerce')
+    if numbers.isna().any():
+        return ids, False
+    return numbers.astype(float), numbers.dtype.kind == "f"
+
+
+# Function to turn running totals back into the StudentID/Score frame the graders return
+def _totals_frame(totals, dtype, text_ids=True):
+    if totals is None:
+        totals = pd.Series(dtype=dtype)
+    else:
+        totals = totals['Score'].copy()
+    # CSV IDs are read as text; give them the type pandas would infer for the whole file before sorting
+    if text_ids:
+        totals.index = infer_ids(totals.index)
+    totals = totals.sort_index().astype(dtype)
+    return pd.DataFrame({'StudentID': totals.index, 'Score': totals.to_numpy()})
+
+
+# Function to turn running per-question totals into the frame GradingRun.question_summary returns;
+# integer_ids turns the QuestionIDs that were kept as floats back into integers
+def _question_frame(totals, integer_ids=False):
+    if totals is None:
+        return pd.DataFrame(columns=['QuestionID', 'Type', 'Responses', 'Total_Score', 'Mean_Score'])
+    if integer_ids:
+        totals.index = totals.index.set_levels(totals.index.levels[0].astype(np.int64), level=0)
+    totals = totals.sort_index()
+    summary = totals.index.to_frame(index=False)
+    summary['Responses'] = totals['Responses'].astype(np.int64).to_numpy()
+    summary['Total_Score'] = totals['Total_Score'].astype(float).to_numpy()
+    summary['Mean_Score'] = summary['Total_Score'] / summary['Responses']
+    return summary
+
+
+# Function to grade a response CSV or Parquet file chunk by chunk;
+# returns ((mcq_scores, essay_scores, final_scores, question_scores), error)
+def grade_csv_in_chunks(key_df, response_file, expected_columns, chunksize=DEFAULT_CHUNKSIZE,
+                        processes=None, backend=None):
+    try:
+        # Built when the first chunk with essay answers comes in, so MCQ-only files never load the model
+        key_embeddings = None
+        question_dtype = key_df['QuestionID'].dtype
+
+        mcq_totals = essay_totals = question_totals = None
+        validator = CsvValidator(expected_columns, key_df, chunked=True)
+        csv_input = not is_parquet(response_file)
+        # Whether a CSV QuestionID was written as a decimal, which makes the whole column float in memory
+        decimal_ids = False
+
+        for chunk in _read_chunks(response_file, expected_columns, chunksize):
+            if csv_input and 'QuestionID' in chunk.columns:
+                chunk['QuestionID'], decimals = _question_ids(chunk['QuestionID'], question_dtype)
+                decimal_ids |= decimals
+            # The validator checks duplicate rows against every earlier chunk and finds each student's first
+            # answer to each question from the same row hashes (about 16 bytes per row of the file)
+            with stage("validate", len(chunk)):
+                validator.check(chunk)
+            if not validator.report.ok:
+                return None, validator.report.message()
+
+            # Keep the first answer of each student to each question, as drop_duplicates does in memory
+            chunk = chunk[validator.first_answers]
+
+            # One grading pass per chunk
+            try:
+                run = GradingRun(key_df, chunk)
+                run.score_mcq()
+                if len(run.rows['ESSAY']):
+                    key_embeddings = key_embeddings or KeyEmbeddings(key_df, backend)
+                run.score_essays(key_embeddings, processes, backend)
+            except Exception as e:
+                print(f"Error: {e}")
+                return None, "Grading failed. Please check the input files and try again."
+            chunk_mcq, chunk_essay, _ = run.totals()
+            mcq_totals = _add_totals(mcq_totals, chunk_mcq, 'StudentID')
+            essay_totals = _add_totals(essay_totals, chunk_essay, 'StudentID')
+            question_totals = _add_totals(question_totals, run.question_summary(), ['QuestionID', 'Type'],
+                                          ('Responses', 'Total_Score'))
+
+        mcq_scores = _totals_frame(mcq_totals, float, csv_input)
+        essay_scores = _totals_frame(essay_totals, np.int64, csv_input)
+        final_scores = pd.concat([mcq_scores, essay_scores]).groupby('StudentID', as_index=False)['Score'].sum()
+        integer_ids = csv_input and question_dtype.kind in "iuf" and not decimal_ids
+        return (mcq_scores, essay_scores, final_scores, _question_frame(question_totals, integer_ids)), None
+    except Exception as e:
+        return None, f"Error reading the file: {str(e)}"
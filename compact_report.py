@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code compares the plain and the compact in-memory form of a student submission.
+It writes a synthetic submission (2 million rows by default, from the cohort generator of benchmark.py, with text
+student IDs as an LMS export has them), loads it both ways and reports the memory the frame takes and how long
+loading, MCQ grading and the per-student totals take.
+Essay encoding is left out, since it costs the same with both forms.
+
+Run it with:  python compact_report.py [--rows 2000000] [--output compact_report.md]
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmark import RESPONSE_COLUMNS, synthetic_cohort, to_markdown
+from graders import score_mcq_responses
+from validator import validate_csv
+
+# Questions in the synthetic exam; the number of students follows from the rows asked for
+QUESTIONS = 40
+
+
+# Function to make a synthetic key and submission of about the given number of rows; returns (key_df, response_df)
+def synthetic_submission(rows, seed=0):
+    key_df, response_df = synthetic_cohort(-(-rows // QUESTIONS), QUESTIONS, essay_words=20, seed=seed)
+    response_df = response_df.iloc[:rows].copy()
+    response_df['StudentID'] = "ST" + response_df['StudentID'].astype(str)
+    return key_df, response_df
+
+
+# Function to load and grade a submission in one form; returns one row of the report
+def measure(name, key_df, path, compact):
+    start = time.perf_counter()
+    response_df, error = validate_csv(path, RESPONSE_COLUMNS, key_df, compact=compact)
+    load_seconds = time.perf_counter() - start
+    if error:
+        raise ValueError(error)
+
+    start = time.perf_counter()
+    mcq_rows = score_mcq_responses(key_df, response_df)
+    mcq_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response_df.drop_duplicates(subset=['StudentID', 'QuestionID'])
+    mcq_rows.groupby('StudentID', observed=True)['Score'].sum()
+    group_seconds = time.perf_counter() - start
+
+    memory = response_df.memory_usage(deep=True)
+    return {
+        "Form": name,
+        "Rows": len(response_df),
+        "Frame_MB": round(memory.sum() / 2**20, 1),
+        "IDs_and_Type_MB": round(memory[['StudentID', 'QuestionID', 'Type']].sum() / 2**20, 1),
+        "Answers_MB": round(memory['Student_Answer'] / 2**20, 1),
+        "Load_Validate_Seconds": round(load_seconds, 3),
+        "MCQ_Seconds": round(mcq_seconds, 3),
+        "Dedup_Groupby_Seconds": round(group_seconds, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the plain and compact in-memory form of a submission.")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="rows in the synthetic submission")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as Markdown to this file")
+    args = parser.parse_args(argv)
+
+    key_df, response_df = synthetic_submission(args.rows, args.seed)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "submission.csv")
+        response_df.to_csv(path, index=False)
+        del response_df
+        report = [measure("Plain", key_df, path, compact=False),
+                  measure("Compact", key_df, path, compact=True)]
+
+    text = "# Compact submission report\n\n" + to_markdown(report) + "\n"
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
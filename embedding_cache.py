@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code is responsible for keeping essay embeddings on disk so the same text is never encoded twice.
+Vectors live in a memory-mapped file and a SQLite index maps (model name, model revision, text hash) to a slot in
+it, with the last time each entry was used so the least recently used entries are evicted first. Several processes
+(the Streamlit app, job workers, the batch grader) may share one cache directory: every lookup and write holds a
+lock file, and a write only changes the rows it adds, evicts or touches instead of rewriting the index.
+A write that stops halfway never leaves the index pointing at the wrong vector: evicted entries are removed first,
+new vectors are only written into free slots, and the new entries are committed after their vectors.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+# fcntl is not available on Windows; there the cache is only safe within one process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+INDEX_FILE = "index.sqlite"
+VECTORS_FILE = "vectors.f32"
+LOCK_FILE = "cache.lock"
+
+# Default size cap for the vector file (256 MB holds about 170,000 MiniLM embeddings)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Keys looked up per query (SQLite limits the number of parameters of one statement)
+QUERY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS layout (
+    dim INTEGER NOT NULL,
+    capacity INTEGER NOT NULL,
+    next_slot INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    slot INTEGER NOT NULL UNIQUE,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS free_slots (
+    slot INTEGER PRIMARY KEY
+);
+"""
+
+
+# Function to build the cache key for a text encoded by a given model
+def cache_key(model_name, model_revision, text):
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}@{model_revision}:{text_hash}"
+
+
+class EmbeddingCache:
+    def __init__(self, directory, dim, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.dim = dim
+        self.capacity = max(1, max_bytes // (dim * 4))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        # One connection per cache object, used by one thread at a time under self._lock
+        self._conn = sqlite3.connect(os.path.join(self.directory, INDEX_FILE), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        vectors_path = os.path.join(self.directory, VECTORS_FILE)
+        with self._lock, self._file_lock(exclusive=True):
+            self._conn.executescript(SCHEMA)
+            layout = self._conn.execute("SELECT dim, capacity FROM layout").fetchone()
+            if layout == (self.dim, self.capacity) and os.path.exists(vectors_path):
+                self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+            else:
+                # Start afresh when there is no index yet or its layout does not match
+                self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="w+", shape=(self.capacity, self.dim))
+                with self._transaction() as conn:
+                    conn.execute("DELETE FROM layout")
+                    conn.execute("INSERT INTO layout (dim, capacity, next_slot) VALUES (?, ?, 0)",
+                                 (self.dim, self.capacity))
+                    self._reset(conn)
+
+    # Lock the cache directory against other processes: shared for lookups, exclusive for writes
+    @contextmanager
+    def _file_lock(self, exclusive):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # One write transaction on the index; rolled back if the block fails
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # Empty the index: no entries and no slot handed out
+    def _reset(self, conn):
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM free_slots")
+        conn.execute("UPDATE layout SET next_slot = 0")
+
+    # Function to return the slots of the keys that are in the index
+    def _lookup(self, keys):
+        slots = {}
+        for start in range(0, len(keys), QUERY_BATCH):
+            batch = keys[start:start + QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            slots.update(self._conn.execute(f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch))
+        return slots
+
+    # Mark entries as used now; uses are numbered, so the index keeps the least recently used order across processes
+    def _touch(self, conn, keys):
+        used = conn.execute("SELECT COALESCE(MAX(used), 0) + 1 FROM entries").fetchone()[0]
+        conn.executemany("UPDATE entries SET used = ? WHERE key = ?", ((used, key) for key in keys))
+        return used
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # Look up a list of keys; returns the cached vectors and the positions that were not found.
+    # Hits are marked as used, so entries that are read often are not the first to be evicted.
+    def get_many(self, keys):
+        found = np.zeros((len(keys), self.dim), dtype=np.float32)
+        with self._lock, self._file_lock(exclusive=False):
+            slots = self._lookup(list(dict.fromkeys(keys)))
+            hits = [i for i, key in enumerate(keys) if key in slots]
+            if hits:
+                found[hits] = self._vectors[[slots[keys[i]] for i in hits]]
+                with self._transaction() as conn:
+                    self._touch(conn, slots)
+            missing = [i for i, key in enumerate(keys) if key not in slots]
+            self.hits += len(hits)
+            self.misses += len(missing)
+        return found, missing
+
+    # Store vectors for a list of keys, evicting the least recently used entries when full. Keys that are already
+    # cached keep their vector and are marked as used. Evicted entries are removed (and their slots freed) before
+    # any vector is written, and the new entries are only committed once their vectors are on disk.
+    def put_many(self, keys, vectors):
+        # The last vector given for a key wins; when there are more keys than slots the last ones are kept
+        new_vectors = dict(zip(keys, vectors))
+        with self._lock, self._file_lock(exclusive=True):
+            cached = self._lookup(list(new_vectors))
+            new_keys = [key for key in new_vectors if key not in cached][-self.capacity:]
+            with self._transaction() as conn:
+                self._touch(conn, cached)
+                slots = self._claim_slots(conn, len(new_keys))
+            if new_keys:
+                self._vectors[slots] = np.stack([new_vectors[key] for key in new_keys])
+                self._vectors.flush()
+                self._add_entries(new_keys, slots)
+
+    # Function to pick free slots for new entries: slots freed earlier, then slots never used (handed out in order),
+    # then the slots of the least recently used entries, which are evicted. The slots are listed as free until the
+    # entries using them are added, so a write that stops halfway leaves them free for the next one.
+    def _claim_slots(self, conn, count):
+        slots = [slot for slot, in conn.execute("SELECT slot FROM free_slots ORDER BY slot LIMIT ?", (count,))]
+        next_slot = conn.execute("SELECT next_slot FROM layout").fetchone()[0]
+        unused = range(next_slot, min(self.capacity, next_slot + count - len(slots)))
+        if unused:
+            conn.execute("UPDATE layout SET next_slot = ?", (unused.stop,))
+            conn.executemany("INSERT INTO free_slots (slot) VALUES (?)", ((slot,) for slot in unused))
+            slots += unused
+        if len(slots) < count:
+            evicted = conn.execute("SELECT key, slot FROM entries ORDER BY used LIMIT ?",
+                                   (count - len(slots),)).fetchall()
+            conn.executemany("DELETE FROM entries WHERE key = ?", ((key,) for key, _ in evicted))
+            conn.executemany("INSERT INTO free_slots (slot) VALUES (?)", ((slot,) for _, slot in evicted))
+            slots += [slot for _, slot in evicted]
+        return slots
+
+    # Function to add the entries whose vectors have been written to their slots
+    def _add_entries(self, keys, slots):
+        with self._transaction() as conn:
+            used = self._touch(conn, [])
+            conn.executemany("DELETE FROM free_slots WHERE slot = ?", ((slot,) for slot in slots))
+            conn.executemany("INSERT INTO entries (key, slot, used) VALUES (?, ?, ?)",
+                             ((key, slot, used) for key, slot in zip(keys, slots)))
+
+    # Function to return every cached key with its slot, least recently used first
+    def entries(self):
+        with self._lock:
+            return list(self._conn.execute("SELECT key, slot FROM entries ORDER BY used, rowid"))
+
+    # Remove every entry from the cache
+    def clear(self):
+        with self._lock, self._file_lock(exclusive=True), self._transaction() as conn:
+            self._reset(conn)
+
+    # Hit/miss counters and fill level of the cache
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+            "capacity": self.capacity,
+        }
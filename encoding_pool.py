@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code is responsible for encoding essays across several CPU processes.
+Each worker process holds its own copy of the model and its own torch thread budget, and the pool is kept
+alive between grading calls so workers are only spawned once.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Runs once in every worker: limit torch threads and load the worker's own model copy
+def _init_worker(threads):
+    import torch
+    from model_provider import warmup
+
+    torch.set_num_threads(threads)
+    warmup()
+
+
+# Runs in a worker: encode one batch of texts into unit-length embeddings
+def _encode_batch(texts, backend):
+    from model_provider import get_model
+
+    embeddings = get_model(backend).encode(texts, batch_size=len(texts), convert_to_numpy=True,
+                                           normalize_embeddings=True, show_progress_bar=False)
+    return embeddings.astype(np.float32, copy=False)
+
+
+class EncodingPool:
+    def __init__(self, processes, threads_per_worker=None):
+        self.processes = processes
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // processes)
+        self._executor = ProcessPoolExecutor(max_workers=processes,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker,
+                                             initargs=(self.threads_per_worker,))
+
+    # Encode batches of texts across the workers; each worker runs exactly the batches the
+    # single-process encoder would. Results are yielded in the order of the batches as they finish.
+    def encode_batches(self, batches, backend=None):
+        return self._executor.map(_encode_batch, batches, [backend] * len(batches))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Function to return the persistent pool, creating it (or resizing it) on demand
+def get_pool(processes, threads_per_worker=None):
+    global _pool
+    with _pool_lock:
+        if _pool is not None and (_pool.processes != processes
+                                  or (threads_per_worker and _pool.threads_per_worker != threads_per_worker)):
+            _pool.shutdown()
+            _pool = None
+        if _pool is None:
+            _pool = EncodingPool(processes, threads_per_worker)
+        return _pool
+
+
+# Function to stop the worker processes
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+atexit.register(shutdown_pool)
@@ -5,48 +5,453 @@ Created on Wed Feb  5 17:15:57 2025
 
 @authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
 """
-from sentence_transformers import SentenceTransformer, util
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from embedding_cache import EmbeddingCache, cache_key
+from instrumentation import stage
+from metrics import (EMBEDDING_CACHE_LOOKUPS, ENCODE_BATCH_SECONDS, ENCODE_BATCH_SIZE, ESSAY_SCORING_SECONDS,
+                     ESSAYS_ENCODED, RESPONSES_GRADED)
+from model_provider import DEFAULT_BACKEND, MODEL_NAME, MODEL_REVISION, embedding_dim, get_model
+from validator import QUESTION_TYPES
 
-# Load sentence transformer model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# On-disk embedding cache, set EMBEDDING_CACHE_DIR to an empty string to turn it off
+EMBEDDING_CACHE_DIR = os.environ.get('EMBEDDING_CACHE_DIR', '.embedding_cache')
+EMBEDDING_CACHE_MAX_MB = int(os.environ.get('EMBEDDING_CACHE_MAX_MB', '256'))
 
-# Function to grade objective (MCQ) questions
-def grade_mcq_questions(key_df, response_df):
-    try:
-        key_df = key_df[key_df['Type'] == 'MCQ']
-        response_df = response_df[response_df['Type'] == 'MCQ']
+# The cache is opened together with the model, since its layout depends on the embedding size
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+# Bumped whenever a change to the grading logic can change a score (used to key cached results)
+GRADER_VERSION = '2.3'
+
+# Essay banding: answers at or above the threshold get full marks, the rest are scaled to 10
+SIMILARITY_THRESHOLD = 0.75
+MAX_ESSAY_SCORE = 10
+
+# Most similarity values (answers x reference answers) computed in one matrix product
+SIMILARITY_BLOCK_VALUES = int(os.environ.get('SIMILARITY_BLOCK_VALUES', str(16 * 1024 * 1024)))
+
+# Most tokens (texts x longest text, padding included) sent to the model in one forward pass
+ENCODE_TOKEN_BUDGET = int(os.environ.get('ENCODE_TOKEN_BUDGET', '16384'))
+
+# Worker processes used for encoding (0 or 1 encodes in this process)
+ENCODE_PROCESSES = int(os.environ.get('ENCODE_PROCESSES', '0'))
+
+# Real and padded token counts of the current grading run, kept per thread (one per Streamlit session)
+_padding_stats = threading.local()
+
+# Function to return integer codes for a column and its distinct values; category codes are used as they are,
+# other columns are factorized (sort=True orders the values the way groupby does)
+def column_codes(column, sort=False):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy().astype(np.int64), column.cat.categories
+    codes, uniques = pd.factorize(column, sort=sort)
+    return codes.astype(np.int64), pd.Index(uniques)
+
+# Function to join the key to the questions of one type; returns that part of the key (one row per question)
+# and the key row of every question code, -1 where the key has no such question
+def join_key(key_df, questions, question_type):
+    key_df = key_df[key_df['Type'] == question_type].drop_duplicates(subset=['QuestionID'])
+    return key_df, pd.Index(key_df['QuestionID']).get_indexer(questions)
+
+# Function to turn MCQ answers into the values they are matched on: answers that are numbers are compared as
+# numbers ("01" matches 1 and "2.0" matches 2) and everything else as text. An answer gets the same grade whether
+# the file was read plain, compact or in chunks, and whatever the other answers in the file look like.
+def mcq_match_values(answers):
+    text = pd.Series(answers, dtype=object).astype(str)
+    numbers = pd.to_numeric(text, errors='coerce')
+    return pd.Index(numbers.astype(object).where(numbers.notna(), text), dtype=object)
+
+# Function to compile the MCQ key into a lookup array: the option code of the correct answer for every question
+# code, or -2 where there is no MCQ key entry (or nobody chose the correct option), so nothing matches it.
+# options are the distinct match values of the answers (see mcq_match_values).
+def compile_mcq_key(mcq_key, key_rows, options):
+    correct_answers = mcq_key['Correct_Answer'].iloc[key_rows[key_rows >= 0]]
+    correct = np.full(len(key_rows), -2, dtype=np.int64)
+    # The options are few, so they are matched as Python objects
+    correct[key_rows >= 0] = options.get_indexer(mcq_match_values(correct_answers))
+    correct[correct < 0] = -2
+    return correct
+
+# Function to return the shared embedding cache, or None when it is turned off
+def get_embedding_cache(backend=None):
+    global _embedding_cache
+    if _embedding_cache is None and EMBEDDING_CACHE_DIR:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                dim = get_model(backend).get_sentence_embedding_dimension()
+                _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, dim,
+                                                  max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+    return _embedding_cache
+
+# Function to move the embedding cache to another directory (an empty string turns it off); it is opened again on
+# the next lookup
+def set_embedding_cache_dir(directory):
+    global EMBEDDING_CACHE_DIR, _embedding_cache
+    with _embedding_cache_lock:
+        EMBEDDING_CACHE_DIR = directory
+        _embedding_cache = None
+
+# Function to split texts into batches by a token budget; texts are sorted by token length so each
+# batch holds texts of similar length and little padding is needed. Returns lists of text positions.
+def token_batches(texts, encoder, token_budget=ENCODE_TOKEN_BUDGET):
+    tokenized = encoder.tokenizer(list(texts), truncation=True, max_length=encoder.max_seq_length,
+                                  return_length=True, return_attention_mask=False, return_token_type_ids=False)
+    lengths = np.asarray(tokenized['length'], dtype=np.int64)
+    
+    batches, batch = [], []
+    for i in np.argsort(lengths, kind='stable'):
+        # Texts come shortest first, so the current text sets the padded length of the batch
+        if batch and (len(batch) + 1) * lengths[i] > token_budget:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    
+    padded_tokens = sum(len(batch) * lengths[batch[-1]] for batch in batches)
+    return batches, int(lengths.sum()), int(padded_tokens)
+
+# Function to start counting padding for a new grading run
+def reset_padding_stats():
+    _padding_stats.real_tokens = 0
+    _padding_stats.padded_tokens = 0
+
+# Padding efficiency of the current run: real tokens divided by padded tokens (None before any encoding)
+def padding_efficiency():
+    padded_tokens = getattr(_padding_stats, 'padded_tokens', 0)
+    return _padding_stats.real_tokens / padded_tokens if padded_tokens else None
+
+# Function to run the model over a list of texts in length-sorted batches and return unit-length embeddings;
+# progress(done, total) is called with the number of texts encoded after every batch
+def _encode_with_model(texts, token_budget=ENCODE_TOKEN_BUDGET, processes=None, backend=None, progress=None):
+    processes = ENCODE_PROCESSES if processes is None else processes
+    backend = backend or DEFAULT_BACKEND
+    # Nothing to encode (e.g. a key with only MCQ questions): the model is not loaded
+    if not texts:
+        return np.zeros((0, embedding_dim(backend)), dtype=np.float32)
+    encoder = get_model(backend)
+    embeddings = np.zeros((len(texts), encoder.get_sentence_embedding_dimension()), dtype=np.float32)
+    
+    batches, real_tokens, padded_tokens = token_batches(texts, encoder, token_budget)
+    _padding_stats.real_tokens = getattr(_padding_stats, 'real_tokens', 0) + real_tokens
+    _padding_stats.padded_tokens = getattr(_padding_stats, 'padded_tokens', 0) + padded_tokens
+    
+    text_batches = [[texts[i] for i in batch] for batch in batches]
+    if processes > 1 and len(batches) > 1:
+        from encoding_pool import get_pool
+        results = get_pool(processes).encode_batches(text_batches, backend)
+    else:
+        results = (encoder.encode(batch, batch_size=len(batch), convert_to_numpy=True,
+                                  normalize_embeddings=True, show_progress_bar=False) for batch in text_batches)
+    
+    # Put the embeddings back in the original order of the texts
+    done = 0
+    batch_start = time.perf_counter()
+    for batch, part in zip(batches, results):
+        ENCODE_BATCH_SECONDS.observe(time.perf_counter() - batch_start)
+        ENCODE_BATCH_SIZE.observe(len(batch))
+        ESSAYS_ENCODED.inc(len(batch))
+        embeddings[batch] = part
+        done += len(batch)
+        if progress is not None:
+            progress(done, len(texts))
+        batch_start = time.perf_counter()
+    return embeddings
+
+# Function to build the embedding cache key for a text
+def _cache_key(text):
+    return cache_key(MODEL_NAME, MODEL_REVISION, text)
+
+# Function to encode a list of texts, taking whatever it can from the embedding cache first
+def encode_texts(texts, token_budget=ENCODE_TOKEN_BUDGET, processes=None, backend=None, progress=None):
+    texts = list(texts)
+    if not texts:
+        return _encode_with_model(texts, token_budget, processes, backend, progress)
+    embedding_cache = get_embedding_cache(backend)
+    if embedding_cache is None:
+        return _encode_with_model(texts, token_budget, processes, backend, progress)
+    
+    keys = [_cache_key(text) for text in texts]
+    embeddings, missing = embedding_cache.get_many(keys)
+    EMBEDDING_CACHE_LOOKUPS.inc(len(keys) - len(missing), result="hit")
+    EMBEDDING_CACHE_LOOKUPS.inc(len(missing), result="miss")
+    if missing:
+        embeddings[missing] = _encode_with_model([texts[i] for i in missing], token_budget, processes, backend,
+                                                 progress)
+        embedding_cache.put_many([keys[i] for i in missing], embeddings[missing])
+    return embeddings
+
+# Function to normalize an answer so copies that differ only in spacing or case are treated as one; lower() rather
+# than casefold(), which would also merge different spellings such as 'Straße' and 'Strasse'
+def normalize_answer(text):
+    return " ".join(str(text).split()).lower()
+
+# Function to factorize answers into unique normalized texts; returns the texts to encode and the inverse index
+def unique_answers(answers):
+    codes, _ = pd.factorize(pd.Series(answers).map(normalize_answer))
+    # Encode the first original occurrence of each group (the model's tokenizer is uncased)
+    _, first_rows = np.unique(codes, return_index=True)
+    return [answers[i] for i in first_rows], codes
+
+# Function to encode answers once per unique normalized text and scatter the embeddings back to every row
+def encode_answers(answers, token_budget=ENCODE_TOKEN_BUDGET, processes=None, backend=None, progress=None):
+    answers = list(answers)
+    if not answers:
+        return encode_texts(answers, token_budget, processes, backend, progress)
+    texts, inverse = unique_answers(answers)
+    return encode_texts(texts, token_budget, processes, backend, progress)[inverse]
+
+# Function to report how many essay answers per question are left after deduplication
+def essay_dedup_report(response_df):
+    response_df = response_df[response_df['Type'] == 'ESSAY']
+    response_df = response_df.drop_duplicates(subset=['StudentID', 'QuestionID'])
+    normalized = response_df['Student_Answer'].map(normalize_answer)
+    report = normalized.groupby(response_df['QuestionID'], observed=True).agg(Responses='size', Unique_Answers='nunique')
+    report['Dedup_Ratio'] = 1 - report['Unique_Answers'] / report['Responses']
+    return report.reset_index()
+
+# Hit/miss counters of the embedding cache
+def embedding_cache_stats():
+    return _embedding_cache.stats() if _embedding_cache is not None else None
+
+# Function to compute the cosine similarity of each row pair of normalized embeddings
+def rowwise_cosine(left, right):
+    return np.einsum('ij,ij->i', left, right)
+
+# Function to turn similarities into essay scores (same banding as the per-row grader)
+def band_similarity(similarity):
+    similarity = np.asarray(similarity, dtype=np.float64)
+    scores = np.where(similarity >= SIMILARITY_THRESHOLD, MAX_ESSAY_SCORE, np.round(similarity * MAX_ESSAY_SCORE))
+    return scores.astype(np.int64)
+
+# Function to return the reference answers of the essay key: every distinct Correct_Answer of each question,
+# grouped by question in the order the questions first appear in the key
+def essay_references(key_df):
+    key_df = key_df[key_df['Type'] == 'ESSAY'].drop_duplicates(subset=['QuestionID', 'Correct_Answer'])
+    question_codes, _ = pd.factorize(key_df['QuestionID'])
+    return key_df.iloc[np.argsort(question_codes, kind='stable')]
+
+# Embedding table for the essay answer key: every reference answer of every question, encoded once and reused for
+# every student row. The references of question i are rows offsets[i] to offsets[i + 1].
+class KeyEmbeddings:
+    def __init__(self, key_df, backend=None):
+        key_df = essay_references(key_df)
         
-        key_df = key_df.drop_duplicates(subset=['QuestionID'])
-        response_df = response_df.drop_duplicates(subset=['StudentID', 'QuestionID'])
+        self.backend = backend or DEFAULT_BACKEND
+        # Questions in the same order as the essay key of join_key
+        self.question_ids = pd.Index(key_df['QuestionID'].drop_duplicates())
+        self.answers = key_df['Correct_Answer'].astype(str).tolist()
+        question_codes = self.question_ids.get_indexer(key_df['QuestionID'])
+        self.offsets = np.searchsorted(question_codes, np.arange(len(self.question_ids) + 1))
+        # References shared by several questions are encoded once
+        with stage("encode", len(self.answers)):
+            self.embeddings = encode_answers(self.answers, backend=self.backend)
+    
+    # Check that this table was built from the same essay key and backend, so it is safe to reuse
+    def matches(self, key_df, backend=None):
+        key_df = essay_references(key_df)
+        return (self.backend == (backend or DEFAULT_BACKEND)
+                and self.question_ids.equals(pd.Index(key_df['QuestionID'].drop_duplicates()))
+                and self.answers == key_df['Correct_Answer'].astype(str).tolist())
+    
+    # Function to return the highest similarity of each answer to the references of its question (an index into
+    # question_ids). Answers are grouped by question and each group is compared with its own references only, in
+    # blocks of answers, so the cost does not grow with the references of the other questions.
+    def best_similarity(self, questions, answer_embeddings):
+        if (np.diff(self.offsets) == 1).all():
+            # One reference per question: each answer is compared with its own reference only
+            return rowwise_cosine(self.embeddings[self.offsets[questions]], answer_embeddings)
         
-        merged_df = response_df.merge(key_df, on=['QuestionID', 'Type'], how="left")
-        merged_df['Score'] = (merged_df['Student_Answer'] == merged_df['Correct_Answer']).astype(float)
+        similarity = np.empty(len(questions), dtype=np.float32)
+        order = np.argsort(questions, kind='stable')
+        bounds = np.searchsorted(questions[order], np.arange(len(self.question_ids) + 1))
+        for question in np.flatnonzero(np.diff(bounds)):
+            references = self.embeddings[self.offsets[question]:self.offsets[question + 1]]
+            rows = order[bounds[question]:bounds[question + 1]]
+            block = max(1, SIMILARITY_BLOCK_VALUES // len(references))
+            for start in range(0, len(rows), block):
+                block_rows = rows[start:start + block]
+                similarity[block_rows] = (answer_embeddings[block_rows] @ references.T).max(axis=1)
+        return similarity
+    
+# Function to turn codes back into the values of a column, keeping category-coded columns categorical
+def code_values(column, uniques, codes):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(codes, dtype=column.dtype)
+    return uniques.take(codes)
+
+# One grading pass over a submission: the responses are partitioned by type and joined to the key once,
+# each partition is scored by its own engine and the totals come from one aggregation
+class GradingRun:
+    def __init__(self, key_df, response_df):
+        self.key_df = key_df
+        self.response_df = response_df
+        with stage("partition", len(response_df)):
+            self.student_codes, self.students = column_codes(response_df['StudentID'], sort=True)
+            self.question_codes, self.questions = column_codes(response_df['QuestionID'], sort=True)
+            type_codes, types = column_codes(response_df['Type'])
+            # Position of each row's type in QUESTION_TYPES, -1 for any other value
+            self.type_codes = np.append(pd.Index(QUESTION_TYPES).get_indexer(types), -1)[type_codes]
+            
+            # Keep the first answer of each student to each question, as drop_duplicates did for each type
+            pair_codes = ((self.type_codes * len(self.students) + self.student_codes) * len(self.questions)
+                          + self.question_codes)
+            first = ~pd.Series(pair_codes).duplicated().to_numpy()
+            self.rows = {question_type: np.flatnonzero(first & (self.type_codes == i))
+                         for i, question_type in enumerate(QUESTION_TYPES)}
+        with stage("join", len(key_df)):
+            self.keys = {question_type: join_key(key_df, self.questions, question_type)
+                         for question_type in QUESTION_TYPES}
+        
+        self.scores = np.zeros(len(response_df))
+        self.scored = []
+    
+    # Function to score the MCQ partition: a gather from the compiled key and an integer comparison
+    def score_mcq(self):
+        rows = self.rows['MCQ']
+        with stage("mcq", len(rows)):
+            # Answers become small option codes (A, B, C, ...)
+            answers = self.response_df['Student_Answer'].iloc[rows]
+            answer_codes, options = column_codes(answers)
+            # Options that are the same number ("1" and "01") become one option; missing answers keep code -1
+            option_codes, options = pd.factorize(mcq_match_values(options))
+            answer_codes = np.append(option_codes, -1)[answer_codes]
+            correct = compile_mcq_key(*self.keys['MCQ'], pd.Index(options, dtype=object))
+            self.restore_scores('MCQ', rows, answer_codes == correct[self.question_codes[rows]])
+        RESPONSES_GRADED.inc(len(rows), type='MCQ')
+    
+    # Function to score the essay partition against the key embeddings (encoded once per question);
+    # rows limits scoring to some of the essay rows, e.g. one checkpointed batch of a background job
+    def score_essays(self, key_embeddings=None, processes=None, backend=None, progress=None, rows=None):
+        start = time.perf_counter()
+        reset_padding_stats()
+        rows = self.rows['ESSAY'] if rows is None else rows
+        # No essays to score: neither the key embeddings nor the model are needed
+        if not len(rows):
+            self.restore_scores('ESSAY', rows, np.empty(0))
+            return
+        # The embedding table holds the questions in the same order as the shared join
+        if key_embeddings is None or not key_embeddings.matches(self.key_df, backend):
+            key_embeddings = KeyEmbeddings(self.key_df, backend)
         
-        return merged_df.groupby('StudentID', as_index=False)['Score'].sum()
+        key_rows = self.keys['ESSAY'][1][self.question_codes[rows]]
+        if (key_rows < 0).any():
+            raise ValueError("Some essay responses have no matching question in the assessment key.")
+        with stage("encode", len(rows)):
+            student_embeddings = encode_answers(self.response_df['Student_Answer'].iloc[rows].astype(str),
+                                                processes=processes, backend=backend, progress=progress)
+        with stage("similarity", len(rows)):
+            similarity = key_embeddings.best_similarity(key_rows, student_embeddings)
+        with stage("banding", len(rows)):
+            self.restore_scores('ESSAY', rows, band_similarity(similarity))
+        RESPONSES_GRADED.inc(len(rows), type='ESSAY')
+        ESSAY_SCORING_SECONDS.observe(time.perf_counter() - start)
+    
+    # Function to set the scores of some rows of one type, e.g. from a checkpoint
+    def restore_scores(self, question_type, rows, scores):
+        self.scores[rows] = scores
+        if question_type not in self.scored:
+            self.scored.append(question_type)
+    
+    # Function to return the scored rows of one type: StudentID, QuestionID, Type and Score
+    def scored_rows(self, question_type):
+        scored_df = self.response_df[['StudentID', 'QuestionID', 'Type']].iloc[self.rows[question_type]].copy()
+        scores = self.scores[self.rows[question_type]]
+        scored_df['Score'] = scores if question_type == 'MCQ' else scores.astype(np.int64)
+        return scored_df
+    
+    # Function to return the positions of every scored row
+    def scored_positions(self):
+        return np.concatenate([self.rows[question_type] for question_type in self.scored] + [np.empty(0, np.int64)])
+    
+    # Function to return the score of every graded response (StudentID, QuestionID, Type, Score), in file order
+    def item_scores(self):
+        rows = np.sort(self.scored_positions())
+        with stage("aggregate", len(rows)):
+            scored_df = self.response_df[['StudentID', 'QuestionID', 'Type']].iloc[rows].reset_index(drop=True)
+            scored_df['Score'] = self.scores[rows]
+        return scored_df
+    
+    # Function to add up the MCQ, essay and final score of every student in one bincount
+    def totals(self):
+        rows = self.scored_positions()
+        with stage("aggregate", len(rows)):
+            index = self.student_codes[rows] * len(QUESTION_TYPES) + self.type_codes[rows]
+            size = len(self.students) * len(QUESTION_TYPES)
+            sums = np.bincount(index, weights=self.scores[rows], minlength=size).reshape(-1, len(QUESTION_TYPES))
+            counts = np.bincount(index, minlength=size).reshape(-1, len(QUESTION_TYPES))
+            
+            mcq_scores = self._student_frame(counts[:, 0] > 0, sums[:, 0])
+            essay_scores = self._student_frame(counts[:, 1] > 0, sums[:, 1].astype(np.int64))
+            final_scores = self._student_frame(counts.any(axis=1), sums.sum(axis=1))
+        return mcq_scores, essay_scores, final_scores
+    
+    def _student_frame(self, answered, scores):
+        answered = np.flatnonzero(answered)
+        student_ids = code_values(self.response_df['StudentID'], self.students, answered)
+        return pd.DataFrame({'StudentID': student_ids, 'Score': scores[answered]})
+    
+    # Function to summarize the scores per question: Responses, Total_Score and Mean_Score for each question,
+    # ordered by QuestionID and Type
+    def question_summary(self):
+        rows = self.scored_positions()
+        with stage("aggregate", len(rows)):
+            index = self.question_codes[rows] * len(QUESTION_TYPES) + self.type_codes[rows]
+            size = len(self.questions) * len(QUESTION_TYPES)
+            responses = np.bincount(index, minlength=size)
+            total_scores = np.bincount(index, weights=self.scores[rows], minlength=size)
+            
+            present = np.flatnonzero(responses)
+            summary = pd.DataFrame({
+                'QuestionID': code_values(self.response_df['QuestionID'], self.questions,
+                                          present // len(QUESTION_TYPES)),
+                'Type': pd.Series(np.asarray(QUESTION_TYPES, dtype=object)[present % len(QUESTION_TYPES)],
+                                  dtype=self.response_df['Type'].dtype),
+                'Responses': responses[present],
+                'Total_Score': total_scores[present],
+            })
+            summary['Mean_Score'] = summary['Total_Score'] / summary['Responses']
+            summary = summary.sort_values(['QuestionID', 'Type'], kind='stable', ignore_index=True)
+        return summary
+
+# Function to score every MCQ response; returns one row per response with its Score
+def score_mcq_responses(key_df, response_df):
+    run = GradingRun(key_df, response_df)
+    run.score_mcq()
+    return run.scored_rows('MCQ')
+
+# Function to grade objective (MCQ) questions
+def grade_mcq_questions(key_df, response_df):
+    try:
+        run = GradingRun(key_df, response_df)
+        run.score_mcq()
+        return run.totals()[0]
     except Exception as e:
         print(f"Error: {e}")
         return None
 
 # Function to grade essay questions
-def grade_essay_questions(key_df, response_df):
+def grade_essay_questions(key_df, response_df, key_embeddings=None, processes=None, backend=None, progress=None):
     try:
-        key_df = key_df[key_df['Type'] == 'ESSAY']
-        response_df = response_df[response_df['Type'] == 'ESSAY']
-        
-        key_df = key_df.drop_duplicates(subset=['QuestionID'])
-        response_df = response_df.drop_duplicates(subset=['StudentID', 'QuestionID'])
-        
-        merged_df = response_df.merge(key_df, on=['QuestionID', 'Type'], how="left")
-        
-        def compute_similarity(row):
-            correct_embedding = model.encode(row['Correct_Answer'], convert_to_tensor=True)
-            student_embedding = model.encode(row['Student_Answer'], convert_to_tensor=True)
-            similarity = util.pytorch_cos_sim(correct_embedding, student_embedding).item()
-            return 10 if similarity >= 0.75 else round(similarity*10)
-        
-        merged_df['Score'] = merged_df.apply(compute_similarity, axis=1)
-        
-        return merged_df.groupby('StudentID', as_index=False)['Score'].sum()
+        run = GradingRun(key_df, response_df)
+        run.score_essays(key_embeddings, processes, backend, progress)
+        return run.totals()[1]
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+# Function to grade both question types in one pass; returns (mcq_scores, essay_scores, final_scores)
+def grade_all_questions(key_df, response_df, key_embeddings=None, processes=None, backend=None, progress=None):
+    try:
+        run = GradingRun(key_df, response_df)
+        run.score_mcq()
+        run.score_essays(key_embeddings, processes, backend, progress)
+        return run.totals()
     except Exception as e:
         print(f"Error: {e}")
         return None
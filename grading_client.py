@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code is a small client for the local grading service (grading_service.py).
+Run on its own it grades the sample files in "CSV files" through the service, then sends many essay requests at
+once and prints the latency of each request and how the service batched them.
+
+Run it with:  python grading_client.py [--url http://127.0.0.1:8765] [--concurrency 16] [--requests 64]
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import argparse
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_DIR = "CSV files"
+
+
+class GradingClient:
+    def __init__(self, url="http://127.0.0.1:8765", timeout=300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise ValueError(json.loads(e.read()).get("error", str(e))) from None
+
+    def health(self):
+        return self._request("/health")
+
+    def stats(self):
+        return self._request("/stats")
+
+    # Function to grade MCQ responses; key and responses are frames or lists of records
+    def grade_mcq(self, key, responses):
+        payload = {"key": _records(key), "responses": _records(responses)}
+        result = self._request("/grade/mcq", payload)
+        return pd.DataFrame(result["scores"]), pd.DataFrame(result["items"])
+
+    # Function to grade essay answers against their reference answers; returns a frame of similarities and scores
+    def grade_essays(self, references, answers):
+        pairs = [{"reference": str(reference), "answer": str(answer)} for reference, answer in zip(references, answers)]
+        return pd.DataFrame(self._request("/grade/essay", {"pairs": pairs})["results"])
+
+
+def _records(df):
+    return df.to_dict(orient="records") if isinstance(df, pd.DataFrame) else list(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade the sample files through the local grading service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--concurrency", type=int, default=16, help="essay requests in flight at once")
+    parser.add_argument("--requests", type=int, default=64, help="essay requests to send")
+    args = parser.parse_args(argv)
+
+    client = GradingClient(args.url)
+    print(client.health())
+
+    key_df = pd.read_csv(os.path.join(SAMPLE_DIR, "correct_answers.csv"))
+    response_df = pd.read_csv(os.path.join(SAMPLE_DIR, "student_response.csv"))
+    mcq_scores, _ = client.grade_mcq(key_df[key_df['Type'] == 'MCQ'], response_df[response_df['Type'] == 'MCQ'])
+    print(mcq_scores)
+
+    essays = response_df[response_df['Type'] == 'ESSAY'].merge(
+        key_df[key_df['Type'] == 'ESSAY'].drop_duplicates(subset=['QuestionID']), on=['QuestionID', 'Type'])
+    references, answers = essays['Correct_Answer'].tolist(), essays['Student_Answer'].tolist()
+
+    # Each request grades one student's essays, so concurrent requests can share micro-batches
+    def one_request(i):
+        start = time.perf_counter()
+        client.grade_essays(references[i % len(references):] + references[:i % len(references)],
+                            answers[i % len(answers):] + answers[:i % len(answers)])
+        return time.perf_counter() - start
+
+    before = client.stats()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        latencies = np.array(list(executor.map(one_request, range(args.requests))))
+    wall = time.perf_counter() - start
+    after = client.stats()
+
+    batches = after["batches"] - before["batches"]
+    print(f"{args.requests} essay requests, {args.concurrency} at a time: {wall:.2f}s "
+          f"({args.requests / wall:.1f} requests/s)")
+    print(f"Latency: median {np.median(latencies) * 1000:.0f} ms, p95 {np.percentile(latencies, 95) * 1000:.0f} ms")
+    print(f"Micro-batches: {batches} ({(after['requests'] - before['requests']) / max(batches, 1):.1f} requests each)")
+
+
+if __name__ == "__main__":
+    main()
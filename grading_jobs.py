@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code runs grading as background jobs, so a large essay run is not tied to one browser session.
+Jobs are kept in a local SQLite database and graded by worker processes that outlive the Streamlit process. The
+essays of a job are graded in batches and every finished batch is checkpointed, so a job whose worker stopped
+(closed app, restart, crash) is picked up again by the next worker and resumes after the last finished batch.
+The Grading System page submits jobs and polls their status. Finished jobs are removed with their files after
+JOB_RETENTION_DAYS; workers do this when they start, and it can be run by hand.
+
+Run a worker by hand with:  python -m grading_jobs worker
+Submit and check jobs with: python -m grading_jobs submit KEY.csv RESPONSES.csv  /  python -m grading_jobs status
+Remove old jobs with:       python -m grading_jobs cleanup --days 7
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Folder for the job database, the uploaded files and the results of every job
+JOBS_DIR = os.environ.get('GRADING_JOBS_DIR', '.grading_jobs')
+
+# Essay rows graded (and checkpointed) together
+JOB_BATCH_ROWS = int(os.environ.get('JOB_BATCH_ROWS', '1024'))
+
+# Worker processes the page keeps running, and how long an idle worker waits for new jobs before it exits
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+WORKER_IDLE_SECONDS = float(os.environ.get('WORKER_IDLE_SECONDS', '600'))
+
+# Workers update their heartbeat this often; a running job without a heartbeat for STALE_SECONDS is taken over
+HEARTBEAT_SECONDS = 5.0
+STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '60'))
+
+# Finished (done or failed) jobs are removed, with their files, this many days after they last changed
+JOB_RETENTION_DAYS = float(os.environ.get('JOB_RETENTION_DAYS', '7'))
+
+KEY_COLUMNS = ["QuestionID", "Correct_Answer", "Type"]
+RESPONSE_COLUMNS = ["StudentID", "QuestionID", "Student_Answer", "Type"]
+RESULT_FRAMES = ("mcq", "essay", "final", "items")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    results_key TEXT,
+    status TEXT NOT NULL,
+    key_path TEXT NOT NULL,
+    response_path TEXT NOT NULL,
+    backend TEXT,
+    batch_rows INTEGER NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    worker INTEGER,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_results_key ON jobs (results_key);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT NOT NULL,
+    batch INTEGER NOT NULL,
+    scores BLOB NOT NULL,
+    PRIMARY KEY (job_id, batch)
+);
+CREATE TABLE IF NOT EXISTS workers (
+    pid INTEGER PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+"""
+
+
+# Function to open the job database; every process and thread uses its own connection
+def connect():
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(JOBS_DIR, "jobs.sqlite"), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Function to copy an uploaded file (or a path) into the job folder, keeping its extension (CSV or Parquet)
+def _store_file(file, folder, name):
+    source = file if isinstance(file, (str, os.PathLike)) else getattr(file, "name", "")
+    path = os.path.join(folder, name + (os.path.splitext(str(source))[1] or ".csv"))
+    if isinstance(file, (str, os.PathLike)):
+        shutil.copyfile(file, path)
+    else:
+        with open(path, "wb") as f:
+            f.write(file.getvalue())
+    return path
+
+
+# Function to submit a grading job; returns the job ID. A job for the same results_key that has not failed is
+# reused, so submitting the same files twice attaches to the running (or finished) job.
+def submit_job(key_file, response_file, results_key=None, backend=None, batch_rows=JOB_BATCH_ROWS):
+    conn = connect()
+    try:
+        if results_key is not None:
+            row = conn.execute("SELECT id FROM jobs WHERE results_key = ? AND status != 'failed' "
+                               "ORDER BY created DESC LIMIT 1", (results_key,)).fetchone()
+            if row is not None:
+                return row["id"]
+
+        job_id = uuid.uuid4().hex
+        folder = os.path.join(JOBS_DIR, job_id)
+        os.makedirs(folder)
+        now = time.time()
+        conn.execute("INSERT INTO jobs (id, results_key, status, key_path, response_path, backend, batch_rows, "
+                     "created, updated) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+                     (job_id, results_key, _store_file(key_file, folder, "key"),
+                      _store_file(response_file, folder, "responses"), backend, batch_rows, now, now))
+        return job_id
+    finally:
+        conn.close()
+
+
+# Function to return the status of a job as a dict (status, done, total, fraction, error, ...), or None
+def job_status(job_id):
+    conn = connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    status = dict(row)
+    status["fraction"] = 1.0 if status["status"] == "done" else (status["done"] / status["total"]
+                                                                  if status["total"] else 0.0)
+    return status
+
+
+# Function to list the most recent jobs
+def list_jobs(limit=10):
+    conn = connect()
+    try:
+        rows = conn.execute("SELECT id, status, done, total, error, created, updated FROM jobs "
+                            "ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame([dict(row) for row in rows], columns=["id", "status", "done", "total", "error",
+                                                              "created", "updated"])
+
+
+# Function to load the results of a finished job: the mcq, essay, final and items frames
+def job_results(job_id):
+    folder = os.path.join(JOBS_DIR, job_id)
+    return {name: pd.read_parquet(os.path.join(folder, f"{name}.parquet")) for name in RESULT_FRAMES}
+
+
+# Function to remove the finished jobs (done or failed) that last changed more than max_age_days ago: their rows,
+# checkpoints and folder, as well as folders left by a submit that stopped before its job was added. Queued and
+# running jobs are never removed. Returns the IDs of the removed jobs.
+def cleanup_jobs(max_age_days=JOB_RETENTION_DAYS):
+    cutoff = time.time() - max_age_days * 24 * 3600
+    conn = connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            job_ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated < ?", (cutoff,))]
+            conn.executemany("DELETE FROM checkpoints WHERE job_id = ?", ((job_id,) for job_id in job_ids))
+            conn.executemany("DELETE FROM jobs WHERE id = ?", ((job_id,) for job_id in job_ids))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        known = {row["id"] for row in conn.execute("SELECT id FROM jobs")}
+    finally:
+        conn.close()
+
+    # A folder without a job may also belong to a submit that is still running, so it is given some time
+    orphan_cutoff = min(cutoff, time.time() - STALE_SECONDS)
+    for name in os.listdir(JOBS_DIR):
+        folder = os.path.join(JOBS_DIR, name)
+        if not os.path.isdir(folder) or name in known:
+            continue
+        if name in job_ids or os.path.getmtime(folder) < orphan_cutoff:
+            shutil.rmtree(folder, ignore_errors=True)
+    return job_ids
+
+
+# Function to start worker processes until JOB_WORKERS are alive; workers run in their own session,
+# so they keep going when the Streamlit process stops
+def ensure_workers(count=JOB_WORKERS):
+    conn = connect()
+    try:
+        conn.execute("DELETE FROM workers WHERE heartbeat < ?", (time.time() - STALE_SECONDS,))
+        alive = conn.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+        for _ in range(count - alive):
+            with open(os.path.join(JOBS_DIR, "worker.log"), "ab") as log:
+                process = subprocess.Popen([sys.executable, "-m", "grading_jobs", "worker"],
+                                           cwd=os.path.dirname(os.path.abspath(__file__)), stdin=subprocess.DEVNULL,
+                                           stdout=log, stderr=log, start_new_session=True)
+            # Registered straight away, so the next page rerun does not start another one
+            conn.execute("INSERT OR REPLACE INTO workers (pid, heartbeat) VALUES (?, ?)", (process.pid, time.time()))
+    finally:
+        conn.close()
+
+
+# Function to claim the oldest queued job, or a running job whose worker stopped; returns its ID or None
+def _claim_job(conn, pid):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND heartbeat < ?) "
+                           "ORDER BY created LIMIT 1", (time.time() - STALE_SECONDS,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?, updated = ? WHERE id = ?",
+                         (pid, time.time(), time.time(), row["id"]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row["id"] if row is not None else None
+
+
+# Keeps the heartbeat of a worker (and of the job it is grading) fresh while batches run
+class Heartbeat:
+    def __init__(self, pid):
+        self.pid = pid
+        self.job_id = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        conn = connect()
+        while not self._stop.is_set():
+            now = time.time()
+            conn.execute("INSERT OR REPLACE INTO workers (pid, heartbeat) VALUES (?, ?)", (self.pid, now))
+            if self.job_id is not None:
+                conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ?", (now, self.job_id, self.pid))
+            self._stop.wait(HEARTBEAT_SECONDS)
+        conn.execute("DELETE FROM workers WHERE pid = ?", (self.pid,))
+        conn.close()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# Function to grade one job, skipping the essay batches that were checkpointed by an earlier worker
+def run_job(conn, job_id):
+    from graders import GradingRun, KeyEmbeddings
+    from validator import validate_csv
+
+    job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    key_df, error = validate_csv(job["key_path"], KEY_COLUMNS)
+    if error:
+        raise ValueError(f"Assessment key: {error}")
+    response_df, error = validate_csv(job["response_path"], RESPONSE_COLUMNS, key_df, compact=True)
+    if error:
+        raise ValueError(f"Student submission: {error}")
+
+    run = GradingRun(key_df, response_df)
+    run.score_mcq()
+
+    essay_rows = run.rows['ESSAY']
+    batches = [essay_rows[start:start + job["batch_rows"]] for start in range(0, len(essay_rows), job["batch_rows"])]
+    saved = {row["batch"]: np.frombuffer(row["scores"], dtype=np.float64)
+             for row in conn.execute("SELECT batch, scores FROM checkpoints WHERE job_id = ?", (job_id,))}
+    done = sum(len(batches[batch]) for batch in saved if batch < len(batches))
+    conn.execute("UPDATE jobs SET total = ?, done = ?, updated = ? WHERE id = ?",
+                 (len(essay_rows), done, time.time(), job_id))
+
+    run.restore_scores('ESSAY', np.empty(0, dtype=np.int64), np.empty(0))
+    key_embeddings = None
+    for batch, rows in enumerate(batches):
+        if batch in saved:
+            run.restore_scores('ESSAY', rows, saved[batch])
+            continue
+        key_embeddings = key_embeddings or KeyEmbeddings(key_df, job["backend"])
+        run.score_essays(key_embeddings, backend=job["backend"], rows=rows)
+        done += len(rows)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR REPLACE INTO checkpoints (job_id, batch, scores) VALUES (?, ?, ?)",
+                     (job_id, batch, run.scores[rows].tobytes()))
+        conn.execute("UPDATE jobs SET done = ?, updated = ? WHERE id = ?", (done, time.time(), job_id))
+        conn.execute("COMMIT")
+
+    mcq_scores, essay_scores, final_scores = run.totals()
+    folder = os.path.join(JOBS_DIR, job_id)
+    results = {"mcq": mcq_scores, "essay": essay_scores, "final": final_scores, "items": run.item_scores()}
+    for name, df in results.items():
+        df.to_parquet(os.path.join(folder, f"{name}.parquet"), index=False)
+
+
+# Function to run a worker: grade jobs until none has come in for idle_seconds (or after one job with once=True)
+def work(idle_seconds=WORKER_IDLE_SECONDS, once=False, poll_seconds=1.0):
+    cleanup_jobs()
+    conn = connect()
+    pid = os.getpid()
+    heartbeat = Heartbeat(pid)
+    idle_since = time.monotonic()
+    try:
+        while True:
+            job_id = _claim_job(conn, pid)
+            if job_id is None:
+                if once or time.monotonic() - idle_since > idle_seconds:
+                    return
+                time.sleep(poll_seconds)
+                continue
+
+            heartbeat.job_id = job_id
+            try:
+                run_job(conn, job_id)
+                # The checkpoints are only needed to resume the job; its results are in its folder now
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?", (time.time(), job_id))
+                conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+                conn.execute("COMMIT")
+            except Exception as e:
+                print(f"Error: job {job_id}: {e}", flush=True)
+                conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                             (str(e), time.time(), job_id))
+            heartbeat.job_id = None
+            idle_since = time.monotonic()
+            if once:
+                return
+    finally:
+        heartbeat.stop()
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m grading_jobs", description="Background grading jobs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="grade queued jobs")
+    worker.add_argument("--once", action="store_true", help="exit after one job")
+    worker.add_argument("--idle-seconds", type=float, default=WORKER_IDLE_SECONDS)
+    submit = commands.add_parser("submit", help="submit a grading job")
+    submit.add_argument("key_file")
+    submit.add_argument("response_file")
+    status = commands.add_parser("status", help="show the status of one job or of the latest jobs")
+    status.add_argument("job_id", nargs="?")
+    cleanup = commands.add_parser("cleanup", help="remove finished jobs and their files")
+    cleanup.add_argument("--days", type=float, default=JOB_RETENTION_DAYS,
+                         help="remove jobs that finished more than this many days ago (0 removes all)")
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        work(args.idle_seconds, args.once)
+    elif args.command == "submit":
+        print(submit_job(args.key_file, args.response_file))
+    elif args.command == "cleanup":
+        print(f"Removed {len(cleanup_jobs(args.days))} finished jobs.")
+    elif args.job_id:
+        print(job_status(args.job_id))
+    else:
+        print(list_jobs().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code runs the graders as a local HTTP service, so other tools can grade without Streamlit.
+The service holds one shared essay model. Essay requests that arrive within a short window are coalesced into one
+micro-batch before the model is called, so each request waits at most a few milliseconds while the model sees
+bigger batches as the load grows. Everything runs on the local machine; with --offline the model is only loaded
+from the local cache.
+
+Run it with:  python -m grading_service [--port 8765] [--window-ms 10] [--max-batch 256] [--offline]
+
+Endpoints (JSON in, JSON out):
+  GET  /health        model, backend and whether it is loaded
+  GET  /stats         requests, micro-batches and texts encoded so far, and the embedding cache hit rate
+  GET  /metrics       grading metrics in the Prometheus text format (see metrics.py)
+  POST /grade/mcq     {"key": [{QuestionID, Correct_Answer, Type}, ...],
+                       "responses": [{StudentID, QuestionID, Student_Answer, Type}, ...]}
+  POST /grade/essay   {"pairs": [{"reference": "...", "answer": "..."}, ...]}
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from graders import GradingRun, band_similarity, embedding_cache_stats, encode_answers, rowwise_cosine
+from model_provider import DEFAULT_BACKEND, MODEL_NAME, is_loaded, warmup
+from validator import CsvValidator
+
+KEY_COLUMNS = ["QuestionID", "Correct_Answer", "Type"]
+RESPONSE_COLUMNS = ["StudentID", "QuestionID", "Student_Answer", "Type"]
+
+# How long the batcher waits for more requests after the first one, and the most texts in one micro-batch
+BATCH_WINDOW_MS = float(os.environ.get('BATCH_WINDOW_MS', '10'))
+MAX_BATCH_TEXTS = int(os.environ.get('MAX_BATCH_TEXTS', '256'))
+
+
+# Coalesces the texts of concurrent requests into micro-batches for the shared model
+class MicroBatcher:
+    def __init__(self, window_ms=BATCH_WINDOW_MS, max_texts=MAX_BATCH_TEXTS, backend=None):
+        self.window = window_ms / 1000
+        self.max_texts = max_texts
+        self.backend = backend
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    # Function to encode texts for one request; blocks until the micro-batch holding them is encoded
+    def encode(self, texts):
+        future = Future()
+        self._queue.put((list(texts), future))
+        metrics.QUEUE_DEPTH.set(self._queue.qsize())
+        return future.result()
+
+    # Function to collect requests until the window closes or the batch is full
+    def _collect(self):
+        pending = [self._queue.get()]
+        count = len(pending[0][0])
+        deadline = time.monotonic() + self.window
+        while count < self.max_texts:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            count += len(pending[-1][0])
+        metrics.QUEUE_DEPTH.set(self._queue.qsize())
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                # Answers repeated across requests are encoded once
+                embeddings = encode_answers(texts, backend=self.backend)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.requests += len(pending)
+                self.batches += 1
+                self.texts += len(texts)
+            start = 0
+            for request_texts, future in pending:
+                future.set_result(embeddings[start:start + len(request_texts)])
+                start += len(request_texts)
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "batches": self.batches, "texts": self.texts,
+                    "mean_batch_texts": self.texts / self.batches if self.batches else 0.0}
+
+
+# Raised for requests the service cannot grade; turned into a 400 response
+class BadRequest(ValueError):
+    pass
+
+
+# Function to turn a list of JSON records into a validated frame
+def records_frame(records, expected_columns, key_df=None, name="rows"):
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise BadRequest(f"'{name}' must be a list of objects")
+    df = pd.DataFrame.from_records(records)
+    validator = CsvValidator(expected_columns, key_df)
+    validator.check(df)
+    if not validator.report.ok:
+        raise BadRequest(f"{name}: {validator.report.message()}")
+    return df
+
+
+# Function to grade MCQ responses against a key; returns the per-student totals and the score of every response
+def grade_mcq(payload):
+    key_df = records_frame(payload.get("key"), KEY_COLUMNS, name="key")
+    response_df = records_frame(payload.get("responses"), RESPONSE_COLUMNS, key_df, name="responses")
+    run = GradingRun(key_df, response_df)
+    run.score_mcq()
+    return {"scores": run.totals()[0].to_dict(orient="records"),
+            "items": run.item_scores().to_dict(orient="records")}
+
+
+# Function to grade (reference, answer) essay pairs; the texts go through the micro-batcher
+def grade_essays(payload, batcher):
+    pairs = payload.get("pairs")
+    if not isinstance(pairs, list) or not all(isinstance(pair, dict) and isinstance(pair.get("reference"), str)
+                                              and isinstance(pair.get("answer"), str) for pair in pairs):
+        raise BadRequest("'pairs' must be a list of {\"reference\": str, \"answer\": str} objects")
+    if not pairs:
+        return {"results": []}
+    embeddings = batcher.encode([pair["reference"] for pair in pairs] + [pair["answer"] for pair in pairs])
+    similarity = rowwise_cosine(embeddings[:len(pairs)], embeddings[len(pairs):])
+    scores = band_similarity(similarity)
+    metrics.RESPONSES_GRADED.inc(len(pairs), type='ESSAY')
+    return {"results": [{"similarity": float(s), "score": int(score)} for s, score in zip(similarity, scores)]}
+
+
+# Function to convert the numpy values pandas hands back into plain JSON values
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class GradingHandler(BaseHTTPRequestHandler):
+    # Set by make_server
+    batcher = None
+    backend = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "model": MODEL_NAME, "backend": self.backend or DEFAULT_BACKEND,
+                             "model_loaded": is_loaded(self.backend)})
+        elif self.path == "/stats":
+            self._send(200, {**self.batcher.stats(), "embedding_cache": embedding_cache_stats()})
+        elif self.path == "/metrics":
+            self._send_text(200, metrics.render(), metrics.CONTENT_TYPE)
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        routes = {"/grade/mcq": grade_mcq, "/grade/essay": lambda payload: grade_essays(payload, self.batcher)}
+        if self.path not in routes:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise BadRequest("The request body must be a JSON object")
+            self._send(200, routes[self.path](payload))
+        except (BadRequest, json.JSONDecodeError) as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            print(f"Error: {e}")
+            self._send(500, {"error": "Grading failed."})
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, path=self.path)
+
+    def _send(self, status, body):
+        self._send_text(status, json.dumps(body, default=_json_default), "application/json")
+
+    def _send_text(self, status, text, content_type):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Requests are not logged one by one
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to build the server; port 0 picks a free port (see server.server_address)
+def make_server(host="127.0.0.1", port=8765, window_ms=BATCH_WINDOW_MS, max_texts=MAX_BATCH_TEXTS, backend=None):
+    handler = type("Handler", (GradingHandler,), {"batcher": MicroBatcher(window_ms, max_texts, backend),
+                                                   "backend": backend})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m grading_service", description="Serve the graders over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS,
+                        help="how long to wait for more essay requests before encoding a micro-batch")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_TEXTS, help="most texts in one micro-batch")
+    parser.add_argument("--offline", action="store_true", help="only load the model from the local cache")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    print(f"Loading {MODEL_NAME}...")
+    warmup()
+
+    server = make_server(args.host, args.port, args.window_ms, args.max_batch)
+    print(f"Grading service listening on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
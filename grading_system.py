@@ -7,76 +7,305 @@ Created on Wed Feb  5 17:15:57 2025
 @authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
 """
 import streamlit as st
-import pandas as pd
 import time  # Time module for delays
-from validator import validate_csv
-from graders import grade_mcq_questions, grade_essay_questions
+from concurrent.futures import ThreadPoolExecutor
+from validator import validate_with_report
+from graders import (GRADER_VERSION, SIMILARITY_THRESHOLD, GradingRun, embedding_cache_stats, essay_dedup_report,
+                     padding_efficiency)
+from grading_jobs import ensure_workers, job_results, job_status, list_jobs, submit_job
+from instrumentation import add_records, collect
+from model_provider import DEFAULT_BACKEND, MODEL_NAME, MODEL_REVISION, load_time, warmup_in_background
+from result_cache import content_hash, result_cache
 
 
 def grading_system_page():
+    # The stages of any validation or grading done in this run are shown in the Diagnostics panel
+    with collect() as trace:
+        grading_page_body()
+    if trace.records:
+        st.session_state.diagnostics = trace.to_frame()
+
+    with st.expander("Diagnostics"):
+        diagnostics = st.session_state.get("diagnostics")
+        if diagnostics is None:
+            st.caption("Stages are shown here after files are validated or graded.")
+        else:
+            st.caption("Wall time, CPU time, rows and memory change of each stage of the last validation or grading.")
+            st.dataframe(diagnostics, hide_index=True)
+        cache_stats = embedding_cache_stats()
+        if cache_stats is not None:
+            st.caption(f"Embedding cache: {cache_stats['entries']} of {cache_stats['capacity']} entries, "
+                       f"{cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                       f"({cache_stats['hit_rate']:.0%} hit rate)")
+        dedup_report = st.session_state.get("dedup_report")
+        if dedup_report is not None and len(dedup_report):
+            st.caption("Essay answers per question before and after identical answers were merged for encoding.")
+            st.dataframe(dedup_report, hide_index=True)
+
+
+def grading_page_body():
     #Grading Page
     st.title("Automatic Grading System")
     st.subheader("Upload the Assessment Key (CSV)")
-    key_file = st.file_uploader("*correct answers.csv*", type=["csv"], key="key_file")
+    key_file = st.file_uploader("*correct answers.csv*", type=["csv", "parquet"], key="key_file")
     st.subheader("Upload the Student's Submission (CSV)")
-    response_file = st.file_uploader("*student submission.csv*", type=["csv"], key="response_file")
+    response_file = st.file_uploader("*student submission.csv*", type=["csv", "parquet"], key="response_file")
+
 
+    # Start loading the essay model in the background while the user picks files (once per process)
+    warmup_in_background()
 
     expected_columns = ["QuestionID", "Correct_Answer", "Type"]
     expected_response_columns = ["StudentID", "QuestionID", "Student_Answer", "Type"]
 
+    key_df = response_df = None
+
     if key_file:
-        key_df, key_error = validate_csv(key_file, expected_columns)
+        key_df, key_error = validate_cached(key_file, expected_columns)
         if key_error:
-            st.error(key_error)
+            show_validation_error(key_error)
         else:
             st.success("Correct answers uploaded successfully.")
             st.dataframe(key_df)
 
     if response_file:
-        response_df, response_error = validate_csv(response_file, expected_response_columns)
+        # Answers are also checked against the questions in the key once the key is valid
+        response_df, response_error = validate_cached(response_file, expected_response_columns, key_file, key_df,
+                                                      compact=True)
         if response_error:
-            st.error(response_error)
+            show_validation_error(response_error)
         else:
             st.success("Student's answers uploaded successfully.")
             st.dataframe(response_df)
 
     if key_file and response_file and key_df is not None and response_df is not None:
+        results_key = ("grade", upload_hash(key_file), upload_hash(response_file), MODEL_NAME, MODEL_REVISION,
+                       DEFAULT_BACKEND, SIMILARITY_THRESHOLD, GRADER_VERSION)
+
+        # Background jobs keep grading when the page is closed and pick up where they stopped
+        background = st.toggle("Grade in the background", key="background_grading")
+        show_results = st.session_state.get("results_key") == results_key
         if st.button("Show Results", type="primary"):
+            st.session_state.results_key = results_key
+            show_results = True
 
-            with st.spinner("In progress"):
-                time.sleep(5)
+        if show_results:
+            results = result_cache.get(results_key)
+            # Essays already being graded in this session are followed to the end, whatever the toggle says now
+            grading = st.session_state.get("essay_grading")
+            in_progress = grading is not None and grading["results_key"] == results_key
+            if results is None and background and not in_progress:
+                results = background_results(key_file, response_file, results_key)
+                if results is not None:
+                    result_cache.put(results_key, results)
+                    show_mcq_results(results["mcq"])
+                    show_essay_results(results["essay"], results["efficiency"])
+                    show_final_results(results)
+            elif results is None:
+                results = grade_and_show(key_df, response_df, results_key)
+                if results is not None:
+                    result_cache.put(results_key, results)
+                    show_final_results(results)
+            else:
+                # Reruns (download, refresh, other widgets) show the stored results instead of grading again
+                show_mcq_results(results["mcq"])
+                show_essay_results(results["essay"], results["efficiency"])
+                show_final_results(results)
 
-            mcq_scores = grade_mcq_questions(key_df, response_df)
-            essay_scores = grade_essay_questions(key_df, response_df)
+    with st.expander("Background jobs"):
+        st.dataframe(list_jobs(), hide_index=True)
 
-            if mcq_scores is not None:
-                st.success("MCQ Result.")
-                #st.subheader("MCQ Scores")
-                st.dataframe(mcq_scores)
+    with st.expander("Cached results"):
+        stats = result_cache.stats()
+        st.caption(f"{stats['entries']} entries, {stats['bytes'] / 2**20:.1f} of {stats['max_bytes'] / 2**20:.0f} MB, "
+                   f"{stats['hits']} hits, {stats['misses']} misses")
+        if st.button("Clear cached results"):
+            result_cache.clear()
+            st.session_state.pop("results_key", None)
+            st.rerun()
 
 
-            if essay_scores is not None:
-                st.success("Essay Result.")
-                #st.subheader("Essay Scores")
-                st.dataframe(essay_scores)
+# Function to hash an upload once; Streamlit gives every new upload a new file_id
+def upload_hash(file):
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    file_id = getattr(file, "file_id", None)
+    if file_id is None:
+        return content_hash(file)
+    if file_id not in hashes:
+        hashes[file_id] = content_hash(file)
+    return hashes[file_id]
 
 
-            if mcq_scores is not None and essay_scores is not None:
-                final_scores = pd.concat([mcq_scores, essay_scores]).groupby('StudentID', as_index=False)['Score'].sum()
-                st.success("Final Result.")
-                st.dataframe(final_scores)
-                #st.subheader("Final Scores")
-                file = final_scores.set_index('StudentID')
-                file = file.to_csv().encode("utf-8")
-            else:
-                st.error("Grading failed. Please check the input files and try again.")
+# Function to validate an upload once per file content (and key) and reuse the result on later reruns;
+# submissions are kept in compact form (category-coded IDs, Arrow-backed answers)
+def validate_cached(file, expected_columns, key_file=None, key_df=None, compact=False):
+    key_hash = upload_hash(key_file) if key_df is not None else None
+    cache_key = ("validate", upload_hash(file), tuple(expected_columns), key_hash, compact, GRADER_VERSION)
+    cached = result_cache.get(cache_key)
+    if cached is None:
+        df, report, error = validate_with_report(file, expected_columns, key_df, compact=compact)
+        cached = (df, (error, report.to_frame()) if error else None)
+        result_cache.put(cache_key, cached)
+    return cached
+
+
+# Function to show a validation error with the table of rows to fix
+def show_validation_error(error):
+    message, problems = error
+    st.error(message.replace("\n", "  \n"))
+    if len(problems):
+        st.dataframe(problems, hide_index=True)
+
+
+# Function to grade both question types in one pass, showing each result as soon as it is ready.
+# The essay grading is kept in the session: a widget click while essays are encoded reruns the page, and the rerun
+# follows the same grading instead of starting again
+def grade_and_show(key_df, response_df, results_key):
+    grading = st.session_state.get("essay_grading")
+    try:
+        if grading is None or grading["results_key"] != results_key:
+            # The responses are partitioned by type and joined to the key once; MCQ scoring is fast,
+            # so its results are shown straight away
+            run = GradingRun(key_df, response_df)
+            run.score_mcq()
+            st.session_state.dedup_report = essay_dedup_report(response_df)
+            # Essays are encoded in a background worker while the progress bar follows the finished batches
+            grading = start_essay_grading(run)
+            grading.update(results_key=results_key, run=run, mcq=run.totals()[0])
+            st.session_state.essay_grading = grading
+        show_mcq_results(grading["mcq"])
+
+        efficiency = wait_for_essays(grading)
+        run = grading["run"]
+        mcq_scores, essay_scores, final_scores = run.totals()
+        show_essay_results(essay_scores, efficiency)
+        results = results_dict(mcq_scores, essay_scores, final_scores, run.item_scores(), efficiency)
+    except Exception as e:
+        st.session_state.pop("essay_grading", None)
+        print(f"Error: {e}")
+        st.error("Grading failed. Please check the input files and try again.")
+        return None
+
+    st.session_state.pop("essay_grading", None)
+    return results
+
+
+# Function to build the stored results of a grading run, with the files offered for download
+def results_dict(mcq_scores, essay_scores, final_scores, item_scores, efficiency=None):
+    file = final_scores.set_index('StudentID')
+    file = file.to_csv().encode("utf-8")
+    # Parquet downloads of the final scores and of the score of every response
+    return {"mcq": mcq_scores, "essay": essay_scores, "final": final_scores, "csv": file,
+            "parquet": final_scores.to_parquet(index=False), "items_parquet": item_scores.to_parquet(index=False),
+            "efficiency": efficiency}
+
+
+# Function to grade through a background job: submits the job once per results key, then polls its status;
+# returns the results once the job is done, None while it runs or after it failed
+def background_results(key_file, response_file, results_key):
+    jobs = st.session_state.setdefault("grading_jobs", {})
+    if results_key not in jobs:
+        jobs[results_key] = submit_job(key_file, response_file, results_key="|".join(map(str, results_key)))
+    job_id = jobs[results_key]
+    status = job_status(job_id)
+
+    if status is None or status["status"] == "failed":
+        print(f"Error: job {job_id}: {status and status['error']}")
+        st.error("Grading failed. Please check the input files and try again.")
+        # Showing the results again submits a new job
+        jobs.pop(results_key)
+        st.session_state.pop("results_key", None)
+        return None
+    if status["status"] == "done":
+        results = job_results(job_id)
+        return results_dict(results["mcq"], results["essay"], results["final"], results["items"])
+
+    ensure_workers()
+    show_job_progress(job_id)
+    return None
+
+
+# Polls a running job every second; the whole page reruns once the job has finished
+@st.fragment(run_every=1)
+def show_job_progress(job_id):
+    status = job_status(job_id)
+    if status["status"] in ("done", "failed"):
+        st.rerun()
+    text = (f"Grading essays in the background: {status['done']} of {status['total']}" if status["total"]
+            else f"Job {status['status']}...")
+    st.progress(status["fraction"], text=text)
+    st.caption("You can close this page; the job keeps running and its results are shown when you come back.")
+
+
+def show_mcq_results(mcq_scores):
+    st.success("MCQ Result.")
+    #st.subheader("MCQ Scores")
+    st.dataframe(mcq_scores)
+
+
+def show_essay_results(essay_scores, efficiency):
+    st.success("Essay Result.")
+    #st.subheader("Essay Scores")
+    st.dataframe(essay_scores)
+    if load_time() is not None:
+        st.caption(f"Essay model loaded in {load_time():.1f}s")
+    if efficiency is not None:
+        st.caption(f"Encoder padding efficiency: {efficiency:.0%}")
+
+
+def show_final_results(results):
+    final_scores = results["final"]
+    st.success("Final Result.")
+    st.dataframe(final_scores)
+    #st.subheader("Final Scores")
+
+    st.bar_chart(data=final_scores, x='StudentID', y='Score', horizontal=True,
+                 height=300)
+    col1, col2, col3 = st.columns(3)
+
+    col1.download_button("Download final result", file_name="final.csv", data = results["csv"],
+                           mime="text/csv", type='primary')
+    col2.download_button("Download as Parquet", file_name="final.parquet", data=results["parquet"],
+                         mime="application/vnd.apache.parquet")
+    col2.download_button("Download item scores (Parquet)", file_name="item_scores.parquet",
+                         data=results["items_parquet"], mime="application/vnd.apache.parquet")
+    if col3.button("Refresh", type='primary'):
+        st.session_state.pop("results_key", None)
+        st.rerun()
+
+
+# Function to start grading the essays of a run in a worker thread; returns the task (its future and progress).
+# The worker is never joined by the script, so a rerun (which Streamlit raises into the script) does not wait for it.
+def start_essay_grading(run):
+    task = {"done": 0, "total": 0}
+
+    def on_progress(done, total):
+        task["done"], task["total"] = done, total
+
+    # Padding statistics are kept per thread, so they are read inside the worker; so are its stages, which are
+    # added to the diagnostics of the run that shows the results
+    def grade():
+        with collect() as trace:
+            run.score_essays(progress=on_progress)
+            return padding_efficiency(), trace.records
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    task["future"] = executor.submit(grade)
+    executor.shutdown(wait=False)
+    return task
 
-            st.bar_chart(data=final_scores, x='StudentID', y='Score', horizontal=True,
-                         height=300)
-            col1, col2, col3 = st.columns(3)
 
-            col1.download_button("Download final result", file_name="final.csv", data = file,
-                                   mime="text/csv", type='primary')
-            if col3.button("Refresh", type='primary'):
-                grading_system_page()
+# Function to drive a progress bar from the encoded batches until the essays of a task are graded;
+# returns the padding efficiency
+def wait_for_essays(task):
+    progress_bar = st.progress(0.0, text="Grading essays...")
+    future = task["future"]
+    while not future.done():
+        if task["total"]:
+            progress_bar.progress(task["done"] / task["total"],
+                                  text=f"Encoding essays: {task['done']} of {task['total']}")
+        time.sleep(0.1)
+    progress_bar.empty()
+    efficiency, records = future.result()
+    add_records(records)
+    return efficiency
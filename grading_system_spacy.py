@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code is responsible for displaying the grading page that uses spaCy and the marks of each question.
+The files are checked with validator.py and graded with spacy_grading.py.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import streamlit as st
+
+from grading_system import show_validation_error
+from spacy_grading import SPACY_KEY_COLUMNS, SPACY_RESPONSE_COLUMNS, grade_questions_spacy
+from validator import validate_with_report
+
+
+def grading_system_spacy_page():
+    st.title("Automatic Grading System")
+    st.subheader("Upload the Assessment Key (CSV)")
+    key_file = st.file_uploader(", ".join(SPACY_KEY_COLUMNS), type=["csv", "parquet"], key="spacy_key_file")
+    st.subheader("Upload the Student's Submission (CSV)")
+    response_file = st.file_uploader(", ".join(SPACY_RESPONSE_COLUMNS), type=["csv", "parquet"],
+                                     key="spacy_response_file")
+
+    key_df = response_df = None
+
+    if key_file:
+        key_df, key_report, key_error = validate_with_report(key_file, SPACY_KEY_COLUMNS)
+        if key_error:
+            show_validation_error((key_error, key_report.to_frame()))
+        else:
+            st.success("Correct answers uploaded and validated successfully.")
+            st.dataframe(key_df.head(20))
+
+    if response_file:
+        response_df, response_report, response_error = validate_with_report(response_file, SPACY_RESPONSE_COLUMNS)
+        if response_error:
+            show_validation_error((response_error, response_report.to_frame()))
+        else:
+            st.success("Student's answers uploaded and validated successfully.")
+            st.dataframe(response_df.head(20))
+
+    if key_df is not None and response_df is not None:
+        if st.button("Show Results", type="primary"):
+            st.subheader("Summary of the Results")
+            with st.spinner("We are working on it..."):
+                scores_df = grade_questions_spacy(key_df, response_df)
+
+            if scores_df is None:
+                st.error("Grading failed. Please check the input files and try again.")
+                return
+            st.dataframe(scores_df)
+            st.bar_chart(data=scores_df, x='StudentID', y='Score', horizontal=True, height=300)
+            st.download_button("Download final result", file_name="final.csv",
+                               data=scores_df.set_index('StudentID').to_csv().encode("utf-8"),
+                               mime="text/csv", type='primary')
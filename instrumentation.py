@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code records where the time of a grading run goes.
+Validation and grading are split into stages (parse, validate, partition, join, mcq, encode, similarity, banding,
+aggregate). Each stage records its wall time, CPU time, row count and the change in memory (RSS) and is written to
+the "grading.stages" logger as one JSON line. Wrap a run in collect() to get its stages back as a table; the
+Grading System page shows them in its Diagnostics panel.
+
+Set GRADING_STAGE_LOG to a file path (or "-" for stderr) to write the stage logs there.
+Set GRADING_PROFILE to a comma-separated list of stage names (e.g. "encode") to profile those stages with cProfile;
+the profiles are written to GRADING_PROFILE_DIR ("profiles" by default) and can be opened with pstats or snakeviz.
+Sampling profilers such as py-spy need no hook: run them against the process, and use the pid and timestamps in
+the stage logs to find the stage in the recording.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+STAGE_LOG = os.environ.get('GRADING_STAGE_LOG', '')
+PROFILE_STAGES = {name.strip() for name in os.environ.get('GRADING_PROFILE', '').split(',') if name.strip()}
+PROFILE_DIR = os.environ.get('GRADING_PROFILE_DIR', 'profiles')
+
+logger = logging.getLogger("grading.stages")
+if STAGE_LOG:
+    _handler = logging.StreamHandler() if STAGE_LOG == "-" else logging.FileHandler(STAGE_LOG)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# Stages recorded by the innermost collect() of the current thread or task
+_current_trace = contextvars.ContextVar("grading_trace", default=None)
+
+# Only one cProfile profiler can run at a time
+_profiling = threading.Lock()
+
+
+# Function to return the resident memory of this process in bytes, or None where it cannot be read
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# The stages recorded while a collect() block ran
+class Trace:
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    # Function to return the stages as a table, one row per stage name in the order they first ran
+    def to_frame(self):
+        columns = ["stage", "calls", "rows", "wall_seconds", "cpu_seconds", "memory_delta_mb", "errors"]
+        if not self.records:
+            return pd.DataFrame(columns=columns)
+        records = pd.DataFrame(self.records)
+        records["calls"] = 1
+        records["errors"] = records["status"] == "error"
+        summary = records.groupby("stage", sort=False).agg(
+            calls=("calls", "sum"), rows=("rows", "sum"), wall_seconds=("wall_seconds", "sum"),
+            cpu_seconds=("cpu_seconds", "sum"), memory_delta_mb=("memory_delta_mb", "sum"), errors=("errors", "sum"))
+        return summary.reset_index()[columns]
+
+
+# Function to collect the stages recorded inside the block (in this thread, or in threads started with
+# contextvars.copy_context()); yields a Trace
+@contextmanager
+def collect():
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+# Function to add stages collected elsewhere (e.g. by a worker that outlived the run that started it) to the stages
+# being collected
+def add_records(records):
+    trace = _current_trace.get()
+    if trace is not None:
+        for record in records:
+            trace.add(record)
+
+
+# Function to record one stage: wall time, CPU time, rows and memory change, logged as JSON; the block may set
+# the row count later through the yielded dict (info["rows"] = ...)
+@contextmanager
+def stage(name, rows=None):
+    info = {"rows": rows}
+    profiler = _start_profile(name)
+    rss_before = current_rss()
+    started = time.time()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    status, error = "ok", None
+    try:
+        yield info
+    except Exception as e:
+        status, error = "error", str(e)
+        raise
+    finally:
+        record = {
+            "stage": name, "status": status, "rows": info["rows"],
+            "wall_seconds": round(time.perf_counter() - wall_start, 6),
+            "cpu_seconds": round(time.process_time() - cpu_start, 6),
+            "memory_delta_mb": None if rss_before is None else round((current_rss() - rss_before) / 2**20, 3),
+            "started": round(started, 6), "pid": os.getpid(), "thread": threading.current_thread().name,
+        }
+        if error is not None:
+            record["error"] = error
+        _stop_profile(profiler, name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(record)
+        level = logging.ERROR if error else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps(record))
+
+
+def _start_profile(name):
+    if name not in PROFILE_STAGES or not _profiling.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profile(profiler, name):
+    if profiler is None:
+        return
+    profiler.disable()
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name}-{os.getpid()}-{time.time_ns()}.prof"))
+    finally:
+        _profiling.release()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code keeps the grading metrics of this process and writes them in the Prometheus text format.
+Counters, gauges and histograms are updated where the work happens (validator.py, graders.py, model_provider.py,
+result_cache.py and grading_service.py); the grading service serves them on GET /metrics for Prometheus to scrape.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import bisect
+import math
+import threading
+
+# Default histogram buckets for latencies in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# Shared parts of the metric types: a name, a help text, label names and one value per label combination
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects the labels {', '.join(self.labelnames) or '(none)'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines += self._samples(key, value)
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{self._labels(key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._labels(key, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {_number(total)}")
+        lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Every metric of this process, in the order they were defined
+REGISTRY = []
+
+
+# Function to write every metric in the Prometheus text exposition format
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ROWS_VALIDATED = Counter("grading_rows_validated_total", "Rows checked by the validator.")
+FAILED_ROWS = Counter("grading_validation_failed_rows_total", "Rows that broke a validation rule, by rule.", ["rule"])
+FILES_VALIDATED = Counter("grading_files_validated_total", "Files read and validated, by result.", ["result"])
+VALIDATION_SECONDS = Histogram("grading_validation_seconds", "Time to read and validate one file.")
+RESPONSES_GRADED = Counter("grading_responses_graded_total", "Responses graded, by question type.", ["type"])
+ESSAYS_ENCODED = Counter("grading_essays_encoded_total", "Texts encoded by the essay model.")
+ENCODE_BATCH_SIZE = Histogram("grading_encode_batch_size", "Texts in one forward pass of the essay model.",
+                              buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+ENCODE_BATCH_SECONDS = Histogram("grading_encode_batch_seconds", "Time to encode one batch of texts.")
+ESSAY_SCORING_SECONDS = Histogram("grading_essay_scoring_seconds", "Time to score the essays of one grading call.")
+MODEL_LOAD_SECONDS = Gauge("grading_model_load_seconds", "Time it took to load the essay model.", ["backend"])
+EMBEDDING_CACHE_LOOKUPS = Counter("grading_embedding_cache_lookups_total", "Embedding cache lookups, by result.",
+                                  ["result"])
+RESULT_CACHE_LOOKUPS = Counter("grading_result_cache_lookups_total", "Result cache lookups, by result.", ["result"])
+QUEUE_DEPTH = Gauge("grading_queue_depth", "Essay requests waiting for the next micro-batch.")
+REQUEST_SECONDS = Histogram("grading_request_seconds", "Time to answer one grading service request.", ["path"])
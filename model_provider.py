@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code is responsible for loading the sentence transformer model.
+The model is loaded once per process, on first use or on an explicit warmup, and shared by every Streamlit session.
+Encoders are kept per backend; "torch" (the float32 sentence transformer) is the only one, and benchmarks can put
+a stand-in encoder in its place.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import threading
+import time
+
+from metrics import MODEL_LOAD_SECONDS
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+MODEL_REVISION = 'main'
+# Size of the model's sentence embeddings, known without loading it
+EMBEDDING_DIM = 384
+
+BACKENDS = ('torch',)
+DEFAULT_BACKEND = 'torch'
+
+_models = {}
+_load_seconds = {}
+_lock = threading.RLock()
+# Backends whose background warmup has been started; guarded by its own lock, since _lock is held while loading
+_warmups_started = set()
+_warmup_lock = threading.Lock()
+
+
+# Function to build the encoder for a backend
+def _load(backend):
+    # Imported here so pages that never grade essays do not pay for torch
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME, revision=MODEL_REVISION)
+
+
+# Function to return the shared encoder for a backend, loading it on the first call
+def get_model(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of: {', '.join(BACKENDS)}")
+    if backend not in _models:
+        with _lock:
+            if backend not in _models:
+                start = time.perf_counter()
+                model = _load(backend)
+                _load_seconds[backend] = time.perf_counter() - start
+                MODEL_LOAD_SECONDS.set(_load_seconds[backend], backend=backend)
+                _models[backend] = model
+    return _models[backend]
+
+
+# Function to use a ready-made encoder for a backend instead of loading the model (e.g. a stand-in for benchmarks)
+def use_model(model, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    with _lock:
+        _models[backend] = model
+        _load_seconds[backend] = 0.0
+
+
+# Function to load the encoder ahead of the first grading run; returns the load time in seconds
+def warmup(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    get_model(backend)
+    return _load_seconds[backend]
+
+
+# Function to start loading the encoder in a background thread; only the first call per backend starts one,
+# so pages can call it on every rerun
+def warmup_in_background(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    with _warmup_lock:
+        if backend in _models or backend in _warmups_started:
+            return
+        _warmups_started.add(backend)
+    threading.Thread(target=_background_warmup, args=(backend,), daemon=True).start()
+
+
+def _background_warmup(backend):
+    try:
+        warmup(backend)
+    except Exception as e:
+        print(f"Error: {e}")
+        # A later rerun tries again
+        with _warmup_lock:
+            _warmups_started.discard(backend)
+
+
+# Function to check whether the encoder has been loaded in this process
+def is_loaded(backend=None):
+    return (backend or DEFAULT_BACKEND) in _models
+
+
+# Function to return the embedding size of a backend; taken from the model once it is loaded
+def embedding_dim(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend in _models:
+        return _models[backend].get_sentence_embedding_dimension()
+    return EMBEDDING_DIM
+
+
+# Seconds it took to import and load the encoder, or None if it has not been loaded yet
+def load_time(backend=None):
+    return _load_seconds.get(backend or DEFAULT_BACKEND)
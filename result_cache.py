@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code is responsible for remembering validated uploads and grading results between Streamlit reruns.
+Entries are keyed by the content hash of the uploaded files plus everything that changes a grade (model, backend,
+threshold and grader version), are shared by every session in the process and are evicted least recently used
+first once the memory budget is reached. They can also be evicted explicitly.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from metrics import RESULT_CACHE_LOOKUPS
+
+# Default memory budget for all cached entries together
+DEFAULT_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_MB', '512')) * 1024 * 1024
+
+
+# Function to hash the content of an uploaded file (or any file-like object or path)
+def content_hash(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            data = f.read()
+    else:
+        data = file.getvalue()
+    return hashlib.sha256(data).hexdigest()
+
+
+# Function to estimate how much memory a cached value takes
+def estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                RESULT_CACHE_LOOKUPS.inc(result="miss")
+                return None
+            self.hits += 1
+            RESULT_CACHE_LOOKUPS.inc(result="hit")
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            self._evict(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = value
+            self._sizes[key] = size
+            # Drop the least recently used entries until the cache fits its budget again
+            while self.total_bytes() > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    # Function to evict one entry explicitly
+    def evict(self, key):
+        with self._lock:
+            self._evict(key)
+
+    def _evict(self, key):
+        self._entries.pop(key, None)
+        self._sizes.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+        }
+
+
+# One cache per process, shared by every Streamlit session
+result_cache = ResultCache()
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+This part of the code grades with spaCy word vectors and the marks set for each question (Marks_Obtainable).
+It is the grader of the earlier "Grading System with Spacy" page (Backup/nlp_grading_system_spacy.py) made into an
+engine: objective answers get their marks when they match the key, theory answers get their marks scaled by the
+spaCy similarity between the answer and the key. Only document vectors are needed, so the texts are streamed
+through nlp.pipe in batches with every pipeline component turned off, each distinct answer is processed once and
+the key answer of each question only once.
+Two engines compute the document vectors: "vectors" (the default) reads the word vector table of the model as a
+memory-mapped array and only loads the tokenizer, "pipeline" loads the model with spaCy and runs nlp.pipe. Both
+give the same similarities as Doc.similarity; compare them with:  python -m spacy_grading
+
+Key columns:        QuestionID, Correct_Answer, Question_Type (Objective or Theory), Marks_Obtainable
+Submission columns: StudentID, QuestionID, Student_Answer, Question_Type
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SPACY_MODEL = os.environ.get('SPACY_MODEL', 'en_core_web_lg')
+SPACY_ENGINES = ('vectors', 'pipeline')
+SPACY_ENGINE = os.environ.get('SPACY_ENGINE', 'vectors')
+
+# Texts per nlp.pipe batch, and worker processes for nlp.pipe (0 or 1 runs in this process)
+SPACY_BATCH_SIZE = int(os.environ.get('SPACY_BATCH_SIZE', '1000'))
+SPACY_PROCESSES = int(os.environ.get('SPACY_PROCESSES', '0'))
+
+# Pipeline components of the en_core_web models; none of them changes the word vectors, so none is loaded
+PIPELINE_COMPONENTS = ["tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "ner"]
+
+SPACY_KEY_COLUMNS = ["QuestionID", "Correct_Answer", "Question_Type", "Marks_Obtainable"]
+SPACY_RESPONSE_COLUMNS = ["StudentID", "QuestionID", "Student_Answer", "Question_Type"]
+
+_nlp = None
+_engines = {}
+_nlp_lock = threading.RLock()
+
+
+# Function to load the spaCy model once, without its pipeline components (the tokenizer and vectors remain)
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                nlp = spacy.load(SPACY_MODEL, exclude=PIPELINE_COMPONENTS)
+                # Other models may bring components of their own
+                nlp.select_pipes(disable=nlp.pipe_names)
+                _nlp = nlp
+    return _nlp
+
+
+# Document vectors computed with nlp.pipe
+class SpacyPipeEngine:
+    def __init__(self, nlp=None, batch_size=SPACY_BATCH_SIZE, processes=SPACY_PROCESSES):
+        self.nlp = nlp if nlp is not None else get_nlp()
+        self.batch_size = batch_size
+        self.processes = processes
+
+    # Function to return the mean word vector of each text and its token IDs (used to spot identical texts)
+    def doc_vectors(self, texts):
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.nlp.vocab.vectors_length), dtype=np.float32)
+        tokens = []
+        docs = self.nlp.pipe(texts, batch_size=self.batch_size, n_process=max(1, self.processes))
+        for i, doc in enumerate(docs):
+            if doc.has_vector:
+                vectors[i] = doc.vector
+            tokens.append(tuple(token.orth for token in doc))
+        return vectors, tokens
+
+
+# Function to find the folder holding the model data (config.cfg, tokenizer, vocab/) of an installed spaCy model
+# or of a model saved to a folder
+def model_path(name=SPACY_MODEL):
+    path = Path(name)
+    if not (path / "config.cfg").exists():
+        import spacy
+        path = Path(spacy.util.get_package_path(name))
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        path = path / f"{meta['lang']}_{meta['name']}-{meta['version']}"
+    return path
+
+
+# Document vectors computed straight from the model's word vector table, without loading the model pipeline.
+# The table is memory-mapped, so only the rows of words that occur in the answers are read; texts are split with
+# the model's own tokenizer and the mean vectors of a whole column are computed at once.
+class SpacyVectorsEngine:
+    def __init__(self, name=SPACY_MODEL):
+        import spacy
+        import srsly
+
+        path = model_path(name)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.tokenizer = spacy.blank(meta["lang"]).tokenizer
+        self.tokenizer.from_disk(path / "tokenizer")
+
+        vocab = path / "vocab"
+        self.table = np.load(vocab / "vectors", mmap_mode="r")
+        config = srsly.read_json(vocab / "vectors.cfg") if (vocab / "vectors.cfg").exists() else {}
+        # Words are looked up by their exact text unless the table was built on lowercase forms
+        self.attribute = "lower" if config.get("attr") == "LOWER" else "orth"
+        key2row = srsly.read_msgpack(vocab / "key2row")
+        keys = np.fromiter(key2row.keys(), dtype=np.uint64, count=len(key2row))
+        rows = np.fromiter(key2row.values(), dtype=np.int64, count=len(key2row))
+        order = np.argsort(keys)
+        self.keys, self.rows = keys[order], rows[order]
+
+    # Function to return the table row of each word key, -1 for words without a vector
+    def lookup(self, keys):
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.rows[positions], -1)
+
+    # Function to return the mean word vector of each text and its token IDs (used to spot identical texts)
+    def doc_vectors(self, texts):
+        texts = list(texts)
+        tokens = [tuple(token.orth for token in doc) for doc in self.tokenizer.pipe(texts)]
+        if self.attribute == "orth":
+            words = tokens
+        else:
+            words = [tuple(token.lower for token in doc) for doc in self.tokenizer.pipe(texts)]
+        lengths = np.fromiter((len(doc) for doc in words), dtype=np.int64, count=len(words))
+        rows = self.lookup(np.fromiter((key for doc in words for key in doc), dtype=np.uint64, count=lengths.sum()))
+
+        # Words without a vector count as zero vectors in the mean, as in spaCy
+        known = np.flatnonzero(rows >= 0)
+        word_vectors = np.zeros((len(rows), self.table.shape[1]), dtype=np.float32)
+        if len(known):
+            unique_rows, inverse = np.unique(rows[known], return_inverse=True)
+            word_vectors[known] = np.asarray(self.table[unique_rows], dtype=np.float32)[inverse]
+
+        vectors = np.zeros((len(texts), self.table.shape[1]), dtype=np.float32)
+        present = np.flatnonzero(lengths)
+        if len(present):
+            starts = (np.cumsum(lengths) - lengths)[present]
+            vectors[present] = np.add.reduceat(word_vectors, starts, axis=0) / lengths[present, None]
+        return vectors, tokens
+
+
+# Function to return the shared engine for a name ("vectors" or "pipeline"), loading it on the first call
+def get_engine(name=None):
+    name = name or SPACY_ENGINE
+    if name not in SPACY_ENGINES:
+        raise ValueError(f"Unknown spaCy engine '{name}', expected one of: {', '.join(SPACY_ENGINES)}")
+    if name not in _engines:
+        with _nlp_lock:
+            if name not in _engines:
+                _engines[name] = SpacyVectorsEngine() if name == 'vectors' else SpacyPipeEngine()
+    return _engines[name]
+
+
+# Function to compute the similarity of each (left, right) pair the way Doc.similarity does: documents with the same
+# tokens are 1.0, a document without any known word is 0.0, anything else is the cosine of the mean vectors
+def pair_similarity(left_vectors, left_tokens, right_vectors, right_tokens):
+    left_norms = np.linalg.norm(left_vectors.astype(np.float64), axis=1)
+    right_norms = np.linalg.norm(right_vectors.astype(np.float64), axis=1)
+    dots = np.einsum('ij,ij->i', left_vectors, right_vectors).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where((left_norms == 0) | (right_norms == 0), 0.0, dots / (left_norms * right_norms))
+    identical = np.fromiter((left == right for left, right in zip(left_tokens, right_tokens)), dtype=bool,
+                            count=len(left_tokens))
+    similarity[identical] = 1.0
+    return similarity
+
+
+# Function to compute the similarity of every answer to its key answer; each distinct answer and each key answer
+# goes through the engine once
+def answer_similarity(engine, answers, key_answers):
+    answer_codes, answer_texts = pd.factorize(pd.Series(answers, dtype=object).astype(str))
+    key_codes, key_texts = pd.factorize(pd.Series(key_answers, dtype=object).astype(str))
+    answer_vectors, answer_tokens = engine.doc_vectors(answer_texts)
+    key_vectors, key_tokens = engine.doc_vectors(key_texts)
+    return pair_similarity(answer_vectors[answer_codes], [answer_tokens[i] for i in answer_codes],
+                           key_vectors[key_codes], [key_tokens[i] for i in key_codes])
+
+
+# Function to grade objective and theory questions with their marks; returns StudentID, Score and
+# Marks_Obtainable (the marks available to the student) per student
+def grade_questions_spacy(key_df, response_df, engine=None):
+    try:
+        # Merge student responses with the assessment key
+        merged_df = pd.merge(response_df, key_df, on=['QuestionID', 'Question_Type'])
+        objective_df = merged_df[merged_df["Question_Type"] == "Objective"].copy()
+        theory_df = merged_df[merged_df["Question_Type"] == "Theory"].copy()
+
+        # Objective answers get their marks when they match the key
+        objective_df['Score'] = ((objective_df['Correct_Answer'] == objective_df['Student_Answer']).astype(float)
+                                 * objective_df['Marks_Obtainable'].astype(float))
+
+        # Theory answers get their marks scaled by the similarity to the key answer
+        if len(theory_df):
+            engine = engine if engine is not None else get_engine()
+            similarity = answer_similarity(engine, theory_df['Student_Answer'], theory_df['Correct_Answer'])
+            theory_df['Score'] = np.round(similarity * theory_df['Marks_Obtainable'].to_numpy(dtype=float), 2)
+        else:
+            theory_df['Score'] = pd.Series(dtype=float)
+
+        merged_df = pd.concat([objective_df, theory_df])
+        return merged_df.groupby("StudentID", as_index=False).agg({"Score": "sum", "Marks_Obtainable": "sum"})
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+
+# Function to time loading an engine and how much it added to the memory of this process
+def _load_engine(name):
+    from instrumentation import current_rss
+    rss_before, start = current_rss(), time.perf_counter()
+    engine = get_engine(name)
+    seconds = time.perf_counter() - start
+    rss = None if rss_before is None else (current_rss() - rss_before) / 2**20
+    return engine, seconds, rss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spacy_grading",
+                                     description="Compare the vectors-only and the pipeline spaCy engines.")
+    parser.add_argument("--key", default=os.path.join("CSV files", "correct_answers_spacy.csv"))
+    parser.add_argument("--responses", default=os.path.join("CSV files", "student_responses_spacy.csv"))
+    args = parser.parse_args(argv)
+
+    key_df = pd.read_csv(args.key)
+    response_df = pd.read_csv(args.responses)
+    theory_df = pd.merge(response_df, key_df, on=['QuestionID', 'Question_Type'])
+    theory_df = theory_df[theory_df['Question_Type'] == 'Theory']
+
+    # The vectors engine is loaded first, so its memory is not shared with the full model
+    similarities = {}
+    for name in ('vectors', 'pipeline'):
+        engine, seconds, rss = _load_engine(name)
+        start = time.perf_counter()
+        similarities[name] = answer_similarity(engine, theory_df['Student_Answer'], theory_df['Correct_Answer'])
+        memory = "" if rss is None else f", {rss:.0f} MB"
+        print(f"{name:<9} load {seconds:6.2f}s{memory}, {len(theory_df)} similarities in "
+              f"{time.perf_counter() - start:.3f}s")
+    print(f"Largest difference: {np.abs(similarities['vectors'] - similarities['pipeline']).max(initial=0.0):.2e}")
+
+
+if __name__ == "__main__":
+    main()
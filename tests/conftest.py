@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Shared test setup: the modules of this project live in the repository root, tests that must not load the
+essay model use the no_model fixture, and tests that grade essays use the stub_model fixture instead of the model.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graders  # noqa: E402
+import model_provider  # noqa: E402
+
+
+# The essay model must not be loaded (or downloaded) when there is nothing to encode, e.g. offline
+@pytest.fixture
+def no_model(monkeypatch, tmp_path):
+    def fail(backend=None):
+        raise RuntimeError("the essay model was loaded")
+    monkeypatch.setattr(model_provider, 'get_model', fail)
+    monkeypatch.setattr(graders, 'get_model', fail)
+    monkeypatch.setattr(graders, 'EMBEDDING_CACHE_DIR', str(tmp_path / 'cache'))
+
+
+# Essays are encoded by the benchmark's hashing stand-in for the model, without the embedding cache
+@pytest.fixture
+def stub_model(monkeypatch):
+    from benchmark import HashingEncoder
+    monkeypatch.setattr(model_provider, '_models', {model_provider.DEFAULT_BACKEND: HashingEncoder()})
+    monkeypatch.setattr(graders, 'EMBEDDING_CACHE_DIR', '')
+    monkeypatch.setattr(graders, '_embedding_cache', None)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the command-line batch grader.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import pandas as pd
+import pytest
+
+import batch_grader
+
+
+@pytest.fixture
+def mcq_files(tmp_path):
+    key_file, response_file = tmp_path / 'key.csv', tmp_path / 'responses.csv'
+    pd.DataFrame({'QuestionID': ['Q1', 'Q2'], 'Correct_Answer': ['A', 'C'], 'Type': ['MCQ', 'MCQ']}).to_csv(
+        key_file, index=False)
+    pd.DataFrame({'StudentID': ['S1', 'S1', 'S2', 'S2'], 'QuestionID': ['Q1', 'Q2', 'Q1', 'Q2'],
+                  'Student_Answer': ['A', 'C', 'B', 'C'], 'Type': ['MCQ'] * 4}).to_csv(response_file, index=False)
+    return str(key_file), str(response_file)
+
+
+# An MCQ-only key must be graded without the essay model, e.g. offline
+@pytest.mark.parametrize("chunksize", [0, 3])
+def test_mcq_only_key(no_model, mcq_files, tmp_path, capsys, chunksize):
+    output_dir = tmp_path / 'results'
+    status = batch_grader.main([*mcq_files, '--output-dir', str(output_dir), '--chunksize', str(chunksize)])
+    assert status == 0, capsys.readouterr().err
+
+    final = pd.read_csv(output_dir / 'final.csv')
+    assert final.set_index('StudentID')['Score'].to_dict() == {'S1': 2, 'S2': 1}
+    per_student = pd.read_csv(output_dir / 'per_student.csv')
+    assert per_student['Essay_Score'].tolist() == [0, 0]
+    assert "Responses graded: 4" in capsys.readouterr().out
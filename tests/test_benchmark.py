@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for comparing benchmark results with a baseline.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import pytest
+
+from benchmark import machine_factor
+
+MACHINE = {"platform": "Linux", "cpu": "Xeon", "cpus": 1, "memory_gb": 5.9}
+
+
+def environment(calibration_seconds, calibration_noise=0.1, **machine):
+    return {"environment": {**MACHINE, **machine, "calibration_seconds": calibration_seconds,
+                            "calibration_noise": calibration_noise}}
+
+
+# A noisy calibration on the same machine must not rescale the timings
+def test_same_machine_is_never_rescaled():
+    assert machine_factor(environment(0.05), environment(0.08)) == 1.0
+
+
+@pytest.mark.parametrize("now, expected", [(0.085, 1.0), (0.16, 2.0), (0.04, 0.5)])
+def test_other_machine_is_rescaled_beyond_the_noise(now, expected):
+    assert machine_factor(environment(now, cpus=8), environment(0.08)) == pytest.approx(expected)
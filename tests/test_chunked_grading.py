@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for grading response files chunk by chunk.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import pytest
+
+from batch_grader import KEY_COLUMNS, RESPONSE_COLUMNS, grade_in_memory
+from chunked_grading import grade_csv_in_chunks
+from validator import validate_csv
+
+KEY_CSV = """QuestionID,Correct_Answer,Type
+1,1,MCQ
+2,B,MCQ
+3,Plants make their food from sunlight.,ESSAY
+"""
+
+STUDENTS = ["9", "10", "11", "100", "2"]
+MCQ_ANSWERS = [("01", "B"), ("2.0", "A"), ("1", "B"), ("3", "C"), ("1.0", "b")]
+ESSAYS = ["Plants make food from sunlight.", "They eat soil.", "plants  make food from sunlight.",
+          "Sunlight feeds plants.", "Plants make their food from sunlight."]
+
+
+# A submission with numeric student IDs, numeric MCQ answers and a second answer of one student to a question
+def response_csv(question_ids):
+    lines = ["StudentID,QuestionID,Student_Answer,Type"]
+    for student, (first, second), essay in zip(STUDENTS, MCQ_ANSWERS, ESSAYS):
+        lines += [f"{student},{question_ids[0]},{first},MCQ", f"{student},{question_ids[1]},{second},MCQ",
+                  f"{student},{question_ids[2]},{essay},ESSAY"]
+    lines.append(f"9,{question_ids[0]},1,MCQ")
+    return "\n".join(lines) + "\n"
+
+
+# Chunked grading gives the same results, in the same order, as grading the whole file in memory
+@pytest.mark.parametrize("question_ids", [("1", "2", "3"), ("1.0", "2.0", "3.0")])
+@pytest.mark.parametrize("chunksize", [2, 7, 100])
+def test_chunked_matches_in_memory(stub_model, tmp_path, question_ids, chunksize):
+    key_file, response_file = tmp_path / "key.csv", tmp_path / "responses.csv"
+    key_file.write_text(KEY_CSV)
+    response_file.write_text(response_csv(question_ids))
+    key_df, _ = validate_csv(str(key_file), KEY_COLUMNS)
+
+    in_memory, _, error = grade_in_memory(key_df, str(response_file))
+    assert error is None
+    chunked, error = grade_csv_in_chunks(key_df, str(response_file), RESPONSE_COLUMNS, chunksize=chunksize)
+    assert error is None
+
+    assert chunked[0]['StudentID'].tolist() == [2, 9, 10, 11, 100]
+    for expected, result in zip(in_memory, chunked):
+        assert result.to_csv(index=False) == expected.to_csv(index=False)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the on-disk embedding cache, including two processes writing to the same directory.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import multiprocessing
+import zlib
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+
+DIM = 8
+
+
+# Every key has its own vector, so a vector read back under the wrong key is easy to spot
+def vector_for(key):
+    return np.random.default_rng(zlib.crc32(key.encode())).random(DIM, dtype=np.float32)
+
+
+def write_keys(directory, prefix, count, max_bytes):
+    cache = EmbeddingCache(directory, DIM, max_bytes=max_bytes)
+    for start in range(0, count, 5):
+        keys = [f"{prefix}-{i}" for i in range(start, min(start + 5, count))]
+        cache.put_many(keys, np.stack([vector_for(key) for key in keys]))
+        # Keys written by this process are read back while the other process keeps writing
+        found, missing = cache.get_many(keys)
+        for i, key in enumerate(keys):
+            if i not in missing and not np.array_equal(found[i], vector_for(key)):
+                raise AssertionError(f"{key} came back with another key's vector")
+
+
+def check_entries(cache):
+    keys = [key for key, _ in cache.entries()]
+    found, missing = cache.get_many(keys)
+    assert not missing
+    for key, vector in zip(keys, found):
+        np.testing.assert_array_equal(vector, vector_for(key))
+
+
+def test_put_and_get(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), DIM)
+    keys = ["a", "b", "c"]
+    cache.put_many(keys, np.stack([vector_for(key) for key in keys]))
+
+    found, missing = EmbeddingCache(str(tmp_path), DIM).get_many(["a", "x", "c"])
+    assert missing == [1]
+    np.testing.assert_array_equal(found[0], vector_for("a"))
+    np.testing.assert_array_equal(found[2], vector_for("c"))
+
+
+def test_two_processes_share_a_directory(tmp_path):
+    directory = str(tmp_path)
+    # Room for everything: no key written by either process may be lost
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=write_keys, args=(directory, prefix, 200, 1024 * 1024)) for prefix in "AB"]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    cache = EmbeddingCache(directory, DIM, max_bytes=1024 * 1024)
+    assert len(cache) == 400
+    check_entries(cache)
+
+
+def test_two_processes_evicting(tmp_path):
+    directory = str(tmp_path)
+    # Room for 64 vectors, so both processes keep evicting each other's entries
+    max_bytes = 64 * DIM * 4
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=write_keys, args=(directory, prefix, 200, max_bytes)) for prefix in "AB"]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    cache = EmbeddingCache(directory, DIM, max_bytes=max_bytes)
+    assert len(cache) == 64
+    assert len({slot for _, slot in cache.entries()}) == 64
+    check_entries(cache)
+
+
+# Reads count as uses in the index on disk, so another process evicts the entry that was used least recently
+def test_reads_keep_entries_from_being_evicted(tmp_path):
+    max_bytes = 4 * DIM * 4
+    keys = ["a", "b", "c", "d"]
+    EmbeddingCache(str(tmp_path), DIM, max_bytes).put_many(keys, np.stack([vector_for(key) for key in keys]))
+    EmbeddingCache(str(tmp_path), DIM, max_bytes).get_many(["a"])
+
+    EmbeddingCache(str(tmp_path), DIM, max_bytes).put_many(["e"], vector_for("e")[None])
+    cache = EmbeddingCache(str(tmp_path), DIM, max_bytes)
+    assert [key for key, _ in cache.entries()] == ["c", "d", "a", "e"]
+    check_entries(cache)
+
+
+# A write that stops after the vectors are written but before the new entries are added leaves every entry with
+# its own vector; the evicted entries are gone and their slots are used by the next write
+def test_interrupted_write_keeps_entries_consistent(tmp_path, monkeypatch):
+    max_bytes = 4 * DIM * 4
+    keys = ["a", "b", "c", "d"]
+    EmbeddingCache(str(tmp_path), DIM, max_bytes).put_many(keys, np.stack([vector_for(key) for key in keys]))
+
+    def stop(self, keys, slots):
+        raise KeyboardInterrupt
+    cache = EmbeddingCache(str(tmp_path), DIM, max_bytes)
+    monkeypatch.setattr(EmbeddingCache, "_add_entries", stop)
+    with pytest.raises(KeyboardInterrupt):
+        cache.put_many(["e", "f"], np.stack([vector_for("e"), vector_for("f")]))
+    monkeypatch.undo()
+
+    cache = EmbeddingCache(str(tmp_path), DIM, max_bytes)
+    assert [key for key, _ in cache.entries()] == ["c", "d"]
+    check_entries(cache)
+    cache.put_many(["g", "h"], np.stack([vector_for("g"), vector_for("h")]))
+    assert sorted(slot for _, slot in cache.entries()) == [0, 1, 2, 3]
+    check_entries(cache)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the graders that do not need the essay model (essays are encoded by a hashing stand-in).
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import graders
+import model_provider
+
+
+def mcq_key():
+    return pd.DataFrame({'QuestionID': ['Q1', 'Q2'], 'Correct_Answer': ['A', 'C'], 'Type': ['MCQ', 'MCQ']})
+
+
+def mcq_responses():
+    return pd.DataFrame({'StudentID': ['S1', 'S1', 'S2', 'S2'], 'QuestionID': ['Q1', 'Q2', 'Q1', 'Q2'],
+                         'Type': ['MCQ'] * 4, 'Student_Answer': ['A', 'C', 'B', 'C']})
+
+
+def test_mcq_only_key_does_not_load_the_model(no_model):
+    mcq_scores, essay_scores, final_scores = graders.grade_all_questions(mcq_key(), mcq_responses())
+    assert mcq_scores.set_index('StudentID')['Score'].to_dict() == {'S1': 2, 'S2': 1}
+    assert essay_scores.empty
+    assert final_scores.set_index('StudentID')['Score'].to_dict() == {'S1': 2, 'S2': 1}
+
+
+def test_empty_encode_does_not_load_the_model(no_model):
+    assert graders.encode_texts([]).shape == (0, model_provider.EMBEDDING_DIM)
+    assert graders.encode_answers([]).shape == (0, model_provider.EMBEDDING_DIM)
+
+
+# A key that also has an essay question nobody answered
+def mixed_key():
+    essay = pd.DataFrame({'QuestionID': ['Q3'], 'Correct_Answer': ['Plants make food from light.'], 'Type': ['ESSAY']})
+    return pd.concat([mcq_key(), essay], ignore_index=True)
+
+
+def test_no_essay_answers_does_not_load_the_model(no_model):
+    run = graders.GradingRun(mixed_key(), mcq_responses())
+    run.score_mcq()
+    run.score_essays()
+    assert run.totals()[2].set_index('StudentID')['Score'].to_dict() == {'S1': 2, 'S2': 1}
+
+
+def test_chunked_mcq_only_does_not_load_the_model(no_model, tmp_path):
+    from chunked_grading import grade_csv_in_chunks
+
+    response_file = tmp_path / 'responses.csv'
+    mcq_responses().to_csv(response_file, index=False)
+    results, error = grade_csv_in_chunks(mixed_key(), str(response_file), list(mcq_responses().columns), chunksize=2)
+    assert error is None
+    mcq_scores, essay_scores, final_scores, question_scores = results
+    assert final_scores.set_index('StudentID')['Score'].to_dict() == {'S1': 2, 'S2': 1}
+    assert essay_scores.empty
+    assert question_scores['Responses'].tolist() == [2, 2]
+
+
+# Answers that are numbers are matched as numbers however the submission was loaded
+def test_numeric_mcq_answers_match_in_plain_and_compact_form(tmp_path):
+    from validator import validate_csv
+
+    key_file, response_file = tmp_path / 'key.csv', tmp_path / 'responses.csv'
+    key_file.write_text("QuestionID,Correct_Answer,Type\n1,1,MCQ\n2,2,MCQ\n")
+    response_file.write_text("StudentID,QuestionID,Student_Answer,Type\n"
+                             "S1,1,01,MCQ\nS1,2,2.0,MCQ\nS2,1,1,MCQ\nS2,2,3,MCQ\nS3,1,A,MCQ\n")
+    key_df, _ = validate_csv(str(key_file), ['QuestionID', 'Correct_Answer', 'Type'])
+    for compact in (False, True):
+        response_df, error = validate_csv(str(response_file), list(mcq_responses().columns), key_df, compact=compact)
+        assert error is None
+        scores = graders.grade_mcq_questions(key_df, response_df)
+        assert scores.set_index('StudentID')['Score'].to_dict() == {'S1': 2, 'S2': 1, 'S3': 0}
+
+
+# Each answer gets the best similarity to the references of its own question only, the same as a brute-force max
+# over that question's references, however the answers are split into blocks
+def test_best_similarity_matches_brute_force_per_question(stub_model, monkeypatch):
+    monkeypatch.setattr(graders, 'SIMILARITY_BLOCK_VALUES', 7)
+    references = {'E1': ['Plants make food from light.', 'Photosynthesis uses sunlight.'],
+                  'E2': ['Water boils at 100 degrees.'],
+                  'E3': ['Gravity pulls objects down.', 'Mass attracts mass.', 'Things fall to the ground.']}
+    key_df = pd.DataFrame([{'QuestionID': question, 'Correct_Answer': answer, 'Type': 'ESSAY'}
+                           for question, answers in references.items() for answer in answers])
+    key_embeddings = graders.KeyEmbeddings(key_df)
+
+    rng = np.random.default_rng(0)
+    questions = rng.integers(0, len(references), 50)
+    answers = rng.normal(size=(50, key_embeddings.embeddings.shape[1])).astype(np.float32)
+    answers /= np.linalg.norm(answers, axis=1, keepdims=True)
+
+    reference_embeddings = dict(zip(key_df['Correct_Answer'], key_embeddings.embeddings))
+    expected = [max(float(answer @ reference_embeddings[reference])
+                    for reference in references[key_embeddings.question_ids[question]])
+                for question, answer in zip(questions, answers)]
+    np.testing.assert_allclose(key_embeddings.best_similarity(questions, answers), expected, rtol=1e-5, atol=1e-6)
+
+
+# Answers that differ only in spacing or case are encoded once; different spellings are not merged
+def test_normalize_answer_only_folds_spacing_and_case():
+    assert graders.normalize_answer("  Hello \n World ") == graders.normalize_answer("hello world")
+    assert graders.normalize_answer("Straße") != graders.normalize_answer("Strasse")
+
+
+# Random answers drawn from a few words, with repeated, re-spaced and re-cased copies and second answers to the same
+# question, so deduplication and first-answer handling are exercised
+def random_submission(question_type, answers, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = 300
+    return pd.DataFrame({'StudentID': [f'S{i}' for i in rng.integers(0, 40, rows)],
+                         'QuestionID': [f'Q{i}' for i in rng.integers(1, 6, rows)],
+                         'Student_Answer': rng.choice(answers, rows),
+                         'Type': question_type})
+
+
+# Function to grade essays the way the grader did before batching: each row encoded on its own and compared with
+# its key answer
+def per_row_essay_scores(encoder, key_df, response_df):
+    key_df = key_df[key_df['Type'] == 'ESSAY'].drop_duplicates(subset=['QuestionID'])
+    response_df = response_df[response_df['Type'] == 'ESSAY'].drop_duplicates(subset=['StudentID', 'QuestionID'])
+    merged_df = response_df.merge(key_df, on=['QuestionID', 'Type'], how="left")
+
+    def compute_similarity(row):
+        similarity = float(encoder.encode([row['Correct_Answer']])[0] @ encoder.encode([row['Student_Answer']])[0])
+        return 10 if similarity >= 0.75 else round(similarity * 10)
+
+    merged_df['Score'] = merged_df.apply(compute_similarity, axis=1)
+    return merged_df.groupby('StudentID', as_index=False)['Score'].sum()
+
+
+def test_batched_essay_scores_match_per_row_scores(stub_model):
+    key_df = pd.DataFrame({'QuestionID': [f'Q{i}' for i in range(1, 6)], 'Type': 'ESSAY',
+                           'Correct_Answer': ['plants make food from light', 'water boils when heated',
+                                              'the heart pumps blood', 'gravity pulls things down',
+                                              'cells divide to grow']})
+    response_df = random_submission('ESSAY', ['plants make food', 'Plants  make FOOD', 'water boils',
+                                              'the heart pumps blood', 'things fall down', 'cells grow', 'no idea'])
+    expected = per_row_essay_scores(model_provider.get_model(), key_df, response_df)
+
+    essay_scores = graders.grade_essay_questions(key_df, response_df)
+    assert essay_scores.set_index('StudentID')['Score'].to_dict() == expected.set_index('StudentID')['Score'].to_dict()
+
+
+# Function to grade MCQs the way the grader did before the key lookup arrays: a left merge and a string comparison
+def merged_mcq_scores(key_df, response_df):
+    key_df = key_df[key_df['Type'] == 'MCQ'].drop_duplicates(subset=['QuestionID'])
+    response_df = response_df[response_df['Type'] == 'MCQ'].drop_duplicates(subset=['StudentID', 'QuestionID'])
+    merged_df = response_df.merge(key_df, on=['QuestionID', 'Type'], how="left")
+    merged_df['Score'] = (merged_df['Student_Answer'] == merged_df['Correct_Answer']).astype(float)
+    return merged_df.groupby('StudentID', as_index=False)['Score'].sum()
+
+
+# Key lookup arrays give the same totals as the merge, in plain and category-coded frames, including questions
+# listed twice in the key (the first answer counts), answers outside the key's options and second answers
+@pytest.mark.parametrize("compact", [False, True])
+def test_mcq_scores_match_the_merge(compact):
+    key_df = pd.DataFrame({'QuestionID': ['Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q2'], 'Type': 'MCQ',
+                           'Correct_Answer': ['A', 'B', 'C', 'D', 'A', 'C']})
+    response_df = random_submission('MCQ', ['A', 'B', 'C', 'D', 'E', 'a'], seed=1)
+    expected = merged_mcq_scores(key_df, response_df).set_index('StudentID')['Score'].to_dict()
+
+    if compact:
+        response_df = response_df.astype({'StudentID': 'category', 'QuestionID': 'category', 'Type': 'category'})
+    mcq_scores = graders.grade_mcq_questions(key_df, response_df)
+    assert mcq_scores.set_index('StudentID')['Score'].to_dict() == expected
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the background grading jobs: a worker grading a job and the retention of finished jobs.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import grading_jobs
+
+
+@pytest.fixture
+def jobs_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(grading_jobs, 'JOBS_DIR', str(tmp_path / 'jobs'))
+    return tmp_path / 'jobs'
+
+
+@pytest.fixture
+def job_files(tmp_path):
+    key_file, response_file = tmp_path / 'key.csv', tmp_path / 'responses.csv'
+    pd.DataFrame({'QuestionID': ['Q1', 'Q2'], 'Correct_Answer': ['A', 'Plants make food from light.'],
+                  'Type': ['MCQ', 'ESSAY']}).to_csv(key_file, index=False)
+    pd.DataFrame({'StudentID': ['S1', 'S1', 'S2', 'S2'], 'QuestionID': ['Q1', 'Q2', 'Q1', 'Q2'],
+                  'Student_Answer': ['A', 'Plants make food from light.', 'B', 'Rocks are hard.'],
+                  'Type': ['MCQ', 'ESSAY', 'MCQ', 'ESSAY']}).to_csv(response_file, index=False)
+    return str(key_file), str(response_file)
+
+
+def set_updated(job_id, updated):
+    conn = grading_jobs.connect()
+    try:
+        conn.execute("UPDATE jobs SET updated = ? WHERE id = ?", (updated, job_id))
+    finally:
+        conn.close()
+
+
+def count_rows(table):
+    conn = grading_jobs.connect()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# A finished job keeps its results but not its checkpoints, which are only needed to resume it
+def test_worker_grades_a_job_and_drops_its_checkpoints(stub_model, jobs_dir, job_files):
+    job_id = grading_jobs.submit_job(*job_files, batch_rows=1)
+    grading_jobs.work(once=True)
+
+    assert grading_jobs.job_status(job_id)['status'] == 'done'
+    assert count_rows('checkpoints') == 0
+    final = grading_jobs.job_results(job_id)['final']
+    assert final['StudentID'].tolist() == ['S1', 'S2']
+
+
+# Finished jobs older than the retention period are removed with their files; newer and unfinished jobs are kept
+def test_cleanup_removes_only_old_finished_jobs(jobs_dir, job_files):
+    old_done, old_failed, new_done, old_queued = (grading_jobs.submit_job(*job_files) for _ in range(4))
+    conn = grading_jobs.connect()
+    try:
+        for job_id, status in [(old_done, 'done'), (old_failed, 'failed'), (new_done, 'done')]:
+            conn.execute("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+        conn.execute("INSERT INTO checkpoints (job_id, batch, scores) VALUES (?, 0, x'00')", (old_failed,))
+    finally:
+        conn.close()
+    ten_days_ago = time.time() - 10 * 24 * 3600
+    for job_id in (old_done, old_failed, old_queued):
+        set_updated(job_id, ten_days_ago)
+    # A folder left by a submit that stopped before its job was added
+    orphan = jobs_dir / 'orphan'
+    orphan.mkdir()
+    os.utime(orphan, (ten_days_ago, ten_days_ago))
+
+    assert sorted(grading_jobs.cleanup_jobs(max_age_days=7)) == sorted([old_done, old_failed])
+    assert grading_jobs.job_status(old_done) is None and grading_jobs.job_status(old_failed) is None
+    assert count_rows('checkpoints') == 0
+    assert sorted(path.name for path in jobs_dir.iterdir() if path.is_dir()) == sorted([new_done, old_queued])
+
+    grading_jobs.main(['cleanup', '--days', '0'])
+    assert grading_jobs.job_status(new_done) is None
+    assert grading_jobs.job_status(old_queued)['status'] == 'queued'
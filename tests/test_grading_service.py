@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the local grading service: the /grade endpoints, their 400 responses and the /metrics endpoint.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+import grading_service
+import metrics
+from benchmark import HashingEncoder
+
+KEY = [{'QuestionID': 'Q1', 'Correct_Answer': 'A', 'Type': 'MCQ'},
+       {'QuestionID': 'Q2', 'Correct_Answer': 'C', 'Type': 'MCQ'}]
+RESPONSES = [{'StudentID': 'S1', 'QuestionID': 'Q1', 'Student_Answer': 'A', 'Type': 'MCQ'},
+             {'StudentID': 'S1', 'QuestionID': 'Q2', 'Student_Answer': 'C', 'Type': 'MCQ'},
+             {'StudentID': 'S2', 'QuestionID': 'Q1', 'Student_Answer': 'B', 'Type': 'MCQ'},
+             {'StudentID': 'S2', 'QuestionID': 'Q2', 'Student_Answer': 'C', 'Type': 'MCQ'}]
+
+
+@pytest.fixture
+def service(stub_model):
+    server = grading_service.make_server(port=0, window_ms=1)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+# Function to send a request; returns the status, content type and body
+def request(url, body=None):
+    data = body if body is None or isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, response.headers["Content-Type"], response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read().decode("utf-8")
+
+
+# Function to read one sample (name with its labels) from the metrics text; 0 if it was not written yet
+def sample(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_grade_mcq(service):
+    status, content_type, body = request(service + "/grade/mcq", {"key": KEY, "responses": RESPONSES})
+    assert status == 200 and content_type == "application/json"
+    result = json.loads(body)
+    assert {row['StudentID']: row['Score'] for row in result['scores']} == {'S1': 2, 'S2': 1}
+    assert len(result['items']) == 4
+
+
+def test_grade_essay_matches_hand_computed_cosine(service):
+    pairs = [{"reference": "Plants make food from light", "answer": "plants make food"},
+             {"reference": "Water boils at 100 degrees", "answer": "Rocks are hard"}]
+    status, _, body = request(service + "/grade/essay", {"pairs": pairs})
+    assert status == 200
+    encoder = HashingEncoder()
+    for pair, result in zip(pairs, json.loads(body)['results']):
+        reference, answer = encoder.encode([pair['reference'], pair['answer']])
+        expected = float(np.dot(reference, answer))
+        assert result['similarity'] == pytest.approx(expected, abs=1e-6)
+        assert result['score'] == (10 if expected >= 0.75 else round(expected * 10))
+
+
+@pytest.mark.parametrize("path, body, error", [
+    ("/grade/mcq", b"{not json", "Expecting property name"),
+    ("/grade/mcq", [1, 2], "The request body must be a JSON object"),
+    ("/grade/mcq", {"key": "Q1", "responses": RESPONSES}, "'key' must be a list of objects"),
+    ("/grade/mcq", {"key": [{'QuestionID': 'Q1', 'Type': 'MCQ'}], "responses": RESPONSES},
+     "key: Missing columns: Correct_Answer"),
+    ("/grade/mcq", {"key": KEY, "responses": RESPONSES + [dict(RESPONSES[0], QuestionID='Q9', StudentID='S3')]},
+     "responses: Some answers are for questions that are not in the assessment key. Rows: 6."),
+    ("/grade/essay", {"pairs": [{"reference": "a"}]}, "'pairs' must be a list of"),
+])
+def test_bad_requests_get_400(service, path, body, error):
+    status, content_type, text = request(service + path, body)
+    assert status == 400 and content_type == "application/json"
+    assert json.loads(text)['error'].startswith(error)
+
+
+def test_unknown_path_gets_404(service):
+    assert request(service + "/grade/other", {})[0] == 404
+    assert request(service + "/other")[0] == 404
+
+
+# Every request is counted, and graded responses and encoded essays show up in the counters
+def test_metrics(service):
+    before = request(service + "/metrics")[2]
+    request(service + "/grade/mcq", {"key": KEY, "responses": RESPONSES})
+    request(service + "/grade/essay", {"pairs": [{"reference": "a b c", "answer": "a b d"}]})
+    request(service + "/grade/mcq", {"key": "bad"})
+
+    status, content_type, after = request(service + "/metrics")
+    assert status == 200 and content_type == metrics.CONTENT_TYPE
+    assert "# TYPE grading_request_seconds histogram" in after
+    grown = {name: sample(after, name) - sample(before, name) for name in [
+        'grading_responses_graded_total{type="MCQ"}', 'grading_responses_graded_total{type="ESSAY"}',
+        'grading_essays_encoded_total', 'grading_request_seconds_count{path="/grade/mcq"}',
+        'grading_request_seconds_count{path="/grade/essay"}']}
+    assert grown == {'grading_responses_graded_total{type="MCQ"}': 4,
+                     'grading_responses_graded_total{type="ESSAY"}': 1,
+                     'grading_essays_encoded_total': 2,
+                     'grading_request_seconds_count{path="/grade/mcq"}': 2,
+                     'grading_request_seconds_count{path="/grade/essay"}': 1}
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the shared model loader, with a stand-in encoder instead of the sentence transformer.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import threading
+import time
+
+import model_provider
+
+
+def test_background_warmup_starts_once(monkeypatch):
+    loads = []
+    loaded = threading.Event()
+
+    def slow_load(backend):
+        loads.append(backend)
+        time.sleep(0.2)
+        loaded.set()
+        return object()
+
+    monkeypatch.setattr(model_provider, '_load', slow_load)
+    monkeypatch.setattr(model_provider, '_models', {})
+    monkeypatch.setattr(model_provider, '_warmups_started', set())
+
+    # Every Streamlit rerun calls it while the model is still loading
+    for _ in range(20):
+        model_provider.warmup_in_background('torch')
+    assert loaded.wait(5)
+    for _ in range(20):
+        model_provider.warmup_in_background('torch')
+    deadline = time.monotonic() + 5
+    while not model_provider.is_loaded('torch') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert model_provider.is_loaded('torch')
+    assert loads == ['torch']
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the vectors-only spaCy engine. spaCy is not needed: the engine gets a small word vector table and a
+whitespace tokenizer in place of the ones it would read from the model.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import spacy_grading
+
+WORDS = ["plants", "make", "food", "from", "light", "water", "boils", "sun", "Plants"]
+VECTORS = np.random.default_rng(0).normal(size=(len(WORDS), 6)).astype(np.float32)
+
+
+def word_key(word):
+    return zlib.crc32(word.encode("utf-8"))
+
+
+# Stand-in for spaCy's tokenizer: splits on spaces and gives each word the same key as the vector table
+class WordTokenizer:
+    def pipe(self, texts):
+        for text in texts:
+            yield [SimpleNamespace(orth=word_key(word), lower=word_key(word.lower())) for word in text.split()]
+
+
+@pytest.fixture
+def engine():
+    engine = spacy_grading.SpacyVectorsEngine.__new__(spacy_grading.SpacyVectorsEngine)
+    engine.tokenizer = WordTokenizer()
+    engine.table = VECTORS
+    engine.attribute = "orth"
+    keys = np.array([word_key(word) for word in WORDS], dtype=np.uint64)
+    order = np.argsort(keys)
+    engine.keys, engine.rows = keys[order], np.arange(len(WORDS))[order]
+    return engine
+
+
+# Function to compute Doc.similarity by hand: the mean of the word vectors (zero for words without one), 1.0 for the
+# same words and 0.0 when either text has no known word
+def hand_similarity(left, right):
+    if left.split() == right.split():
+        return 1.0
+    means = []
+    for text in (left, right):
+        vectors = [VECTORS[WORDS.index(word)] if word in WORDS else np.zeros(6) for word in text.split()]
+        means.append(np.mean(vectors, axis=0) if vectors else np.zeros(6))
+    norms = np.linalg.norm(means[0]) * np.linalg.norm(means[1])
+    return float(means[0] @ means[1] / norms) if norms else 0.0
+
+
+PAIRS = [("plants make food", "plants make food from light"),
+         ("plants make unknown words", "water boils"),
+         ("Plants make food", "plants make food"),
+         ("sun sun sun", "light"),
+         ("nothing known here", "plants"),
+         ("", "water"),
+         ("water boils", "water boils")]
+
+
+def test_similarity_matches_hand_computed_cosine(engine):
+    answers, key_answers = zip(*PAIRS)
+    similarity = spacy_grading.answer_similarity(engine, list(answers), list(key_answers))
+    np.testing.assert_allclose(similarity, [hand_similarity(*pair) for pair in PAIRS], rtol=1e-5, atol=1e-6)
+
+
+def test_grade_questions_with_marks(engine):
+    key_df = pd.DataFrame({'QuestionID': [1, 2], 'Correct_Answer': ['B', 'plants make food from light'],
+                           'Question_Type': ['Objective', 'Theory'], 'Marks_Obtainable': [2, 5]})
+    response_df = pd.DataFrame({'StudentID': ['S1', 'S1', 'S2', 'S2'], 'QuestionID': [1, 2, 1, 2],
+                                'Student_Answer': ['B', 'plants make food', 'C', 'water boils'],
+                                'Question_Type': ['Objective', 'Theory', 'Objective', 'Theory']})
+    scores = spacy_grading.grade_questions_spacy(key_df, response_df, engine).set_index('StudentID')
+    expected = {'S1': 2 + round(hand_similarity('plants make food', 'plants make food from light') * 5, 2),
+                'S2': round(hand_similarity('water boils', 'plants make food from light') * 5, 2)}
+    assert scores['Score'].to_dict() == pytest.approx(expected, abs=1e-9)
+    assert scores['Marks_Obtainable'].to_dict() == {'S1': 7, 'S2': 7}
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the CSV validator.
+Created on Sun Oct 18 2026
+
+@authors: YOMI, ADURA, OKON, SOLOMON, ABEL, AMOS, CHRISTIANA, CORNELIUS
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import validator
+from validator import CsvValidator, validate_csv
+
+RESPONSE_COLUMNS = ["StudentID", "QuestionID", "Student_Answer", "Type"]
+
+
+def random_responses(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'StudentID': rng.integers(0, 30, rows).astype(str),
+                         'QuestionID': rng.integers(0, 10, rows).astype(str),
+                         'Student_Answer': rng.choice(['A', 'B', 'C'], rows),
+                         'Type': rng.choice(['MCQ', 'ESSAY'], rows)})
+
+
+# Checking a file chunk by chunk finds the same duplicate rows and first answers as checking it whole
+def test_chunked_duplicates_match_whole_file():
+    df = random_responses(3000)
+    validator = CsvValidator(RESPONSE_COLUMNS, chunked=True)
+    first_answers = []
+    for start in range(0, len(df), 170):
+        validator.check(df.iloc[start:start + 170])
+        first_answers.append(validator.first_answers)
+
+    duplicated = df.duplicated().to_numpy()
+    assert validator.report.counts['duplicate_rows'] == duplicated.sum()
+    assert validator.report.examples['duplicate_rows'] == list(np.flatnonzero(duplicated)[:5] + 2)
+    expected_first = ~df.duplicated(subset=['Type', 'StudentID', 'QuestionID']).to_numpy()
+    np.testing.assert_array_equal(np.concatenate(first_answers), expected_first)
+
+
+# IDs that only differ by leading zeros do not stop a submission from being loaded in the compact form
+def test_compact_read_keeps_ids_that_collide_as_numbers(tmp_path):
+    path = tmp_path / "responses.csv"
+    path.write_text("StudentID,QuestionID,Student_Answer,Type\n007,1,A,MCQ\n7,1,B,MCQ\n8,1,A,MCQ\n")
+    plain, plain_error = validate_csv(str(path), RESPONSE_COLUMNS)
+    compact, compact_error = validate_csv(str(path), RESPONSE_COLUMNS, compact=True)
+    assert plain_error is None and compact_error is None
+    assert list(compact['StudentID'].astype(str)) == ["007", "7", "8"]
+    assert compact['QuestionID'].tolist() == plain['QuestionID'].tolist()
+
+
+EDGE_CASES = {
+    'numeric_ids': "1,1,A,MCQ\n2,1,B,MCQ\n",
+    'leading_zeros': "007,01,A,MCQ\n8,2,B,MCQ\n",
+    'float_ids': "S1,1.5,A,MCQ\nS1,2,B,MCQ\n",
+    'quoted_answers': 'S1,1,"a, b ""c""",ESSAY\nS2,1,"two\nlines",ESSAY\n',
+    'date_answers': "S1,1,2024-01-05,ESSAY\nS2,1,x,ESSAY\n",
+    'missing_answer': "S1,1,,MCQ\nS2,1,B,MCQ\n",
+    'missing_id': "NA,1,A,MCQ\n5,1,B,MCQ\n",
+    'duplicate_rows': "S1,1,A,MCQ\nS1,1,A,MCQ\n",
+}
+
+
+# The pyarrow reader and pandas' own parser accept and reject the same files and give the IDs the same values and
+# types as a plain pd.read_csv of the file (the validator before the pyarrow reader)
+@pytest.mark.parametrize("arrow", [True, False])
+@pytest.mark.parametrize("case", sorted(EDGE_CASES))
+def test_fast_read_matches_pandas_read(tmp_path, monkeypatch, case, arrow):
+    monkeypatch.setattr(validator, "ARROW_CSV", arrow)
+    path = tmp_path / "responses.csv"
+    path.write_text("StudentID,QuestionID,Student_Answer,Type\n" + EDGE_CASES[case])
+    expected = pd.read_csv(path)
+    df, error = validate_csv(str(path), RESPONSE_COLUMNS)
+    expected_ok = not expected.isnull().values.any() and not expected.duplicated().any()
+    assert (error is None) == expected_ok
+    if df is not None:
+        for column in ['StudentID', 'QuestionID']:
+            assert df[column].dtype.kind == expected[column].dtype.kind
+            assert df[column].tolist() == expected[column].tolist()
+        assert df['Student_Answer'].tolist() == expected['Student_Answer'].astype(str).tolist()
+
+
+# Behaviour change: IDs may only use letters, digits, '_', '-' and '.', so files with IDs such as "Ada Obi" or
+# "S/1" that used to be accepted are now rejected with the rows to fix
+@pytest.mark.parametrize("compact", [False, True])
+def test_ids_outside_id_pattern_are_rejected(tmp_path, compact):
+    path = tmp_path / "responses.csv"
+    path.write_text("StudentID,QuestionID,Student_Answer,Type\n"
+                    "Ada Obi,1,A,MCQ\nS/1,1,B,MCQ\nS-1_a.b,1,A,MCQ\n")
+    assert not pd.read_csv(path).isnull().values.any()
+    df, error = validate_csv(str(path), RESPONSE_COLUMNS, compact=compact)
+    assert df is None
+    assert error == "IDs may only contain letters, digits, '_', '-' and '.'. Rows: 2, 3."